@@ -0,0 +1,127 @@
+import numpy as np
+
+# ------------------------------------------------------------
+# PRECOMPUTED EMISSIONS AGGREGATES
+# ------------------------------------------------------------
+# The raw inventory is reduced once, offline, to a tidy (country, year,
+# sector) cube. When a country is loaded its slice of the cube becomes a
+# dense (year x sector) matrix plus cumulative sums over the years, so any
+# year range and sector selection is answered with a difference of two
+# cumulative rows and some indexing, never by regrouping rows.
+
+TOP_N_SECTORS = 5
+
+
+def build_emissions_cube(df):
+    """Sum emissions per (country, year, sector), sorted by those keys."""
+    return (
+        df.groupby(["iso3_country", "year", "sector"], as_index=False)
+          .agg(emissions=("emissions", "sum"))
+    )
+
+
+def aggregate_country(country_cube):
+    """Dense (year x sector) emissions of one country and their running sums.
+
+    Sectors are in alphabetical order; combinations absent from the
+    inventory are NaN in ``matrix`` and count as 0 in the cumulative sums.
+    Row i of ``cumsum``/``present_cumsum`` covers the first i years.
+    """
+    year = country_cube["year"].to_numpy()
+    sector = country_cube["sector"].to_numpy().astype(object)
+    years = np.unique(year)
+    sectors = np.unique(sector)
+
+    matrix = np.full((len(years), len(sectors)), np.nan)
+    matrix[np.searchsorted(years, year), np.searchsorted(sectors, sector)] = (
+        country_cube["emissions"].to_numpy()
+    )
+
+    present = ~np.isnan(matrix)
+    zero_row = np.zeros((1, len(sectors)))
+
+    agg = {
+        "years": years,
+        "sectors": sectors,
+        "matrix": matrix,
+        "present": present,
+        "cumsum": np.vstack([zero_row, np.cumsum(np.where(present, matrix, 0.0), axis=0)]),
+        "present_cumsum": np.vstack([zero_row, np.cumsum(present, axis=0)]),
+    }
+    # Shared by every request (and, preloaded, by every worker): read-only
+    for values in agg.values():
+        values.flags.writeable = False
+    return agg
+
+
+def select_view(agg, year_range, sectors=None, top_n=TOP_N_SECTORS, share_year=None):
+    """Everything the figures need for a year range and sector selection.
+
+    The sector shares cover the emissions summed over ``year_range``
+    (inclusive), or those of ``share_year`` alone when given. Without
+    ``sectors``, the trend and structure series cover the ``top_n``
+    sectors by that share.
+    """
+    first, last = year_range
+    years = agg["years"]
+    start = np.searchsorted(years, first, side="left")
+    stop = np.searchsorted(years, last, side="right")
+
+    share_start, share_stop = start, stop
+    if share_year is not None:
+        share_start = np.searchsorted(years, share_year, side="left")
+        share_stop = np.searchsorted(years, share_year, side="right")
+
+    if share_stop - share_start == 1:
+        # A single year: take the row as is rather than a difference
+        totals = np.where(agg["present"][share_start], agg["matrix"][share_start], 0.0)
+        counts = agg["present"][share_start]
+    else:
+        totals = agg["cumsum"][share_stop] - agg["cumsum"][share_start]
+        counts = agg["present_cumsum"][share_stop] - agg["present_cumsum"][share_start]
+
+    in_range = np.flatnonzero(counts > 0)
+    range_totals = totals[in_range]
+    shares = range_totals / range_totals.sum() if len(in_range) else range_totals
+
+    ascending = np.argsort(shares)
+    descending = ascending[np.argsort(-shares[ascending], kind="stable")]
+
+    if sectors:
+        column = {sector: k for k, sector in enumerate(agg["sectors"])}
+        chosen = [column[s] for s in dict.fromkeys(sectors) if s in column]
+    else:
+        chosen = in_range[descending[:top_n]].tolist()
+    chosen = sorted(chosen)
+
+    window_years = years[start:stop]
+    window = agg["matrix"][start:stop][:, chosen]
+    window_present = agg["present"][start:stop][:, chosen]
+    year_totals = np.where(window_present, window, 0.0).sum(axis=1)
+
+    # One series per chosen sector, in order of first appearance (earliest
+    # year first, then alphabetically), ready for the trend and structure
+    # traces
+    series = []
+    for k, sector in enumerate(agg["sectors"][chosen]):
+        mask = window_present[:, k]
+        if not mask.any():
+            continue
+        series.append({
+            "sector": sector,
+            "first": int(np.argmax(mask)),
+            "year": window_years[mask],
+            "emissions": window[mask, k],
+            "share": window[mask, k] / year_totals[mask],
+        })
+    series.sort(key=lambda s: s["first"])
+
+    return {
+        "year_range": (int(first), int(last)),
+        "share_years": (int(share_year), int(share_year)) if share_year is not None else (int(first), int(last)),
+        "selected_sectors": bool(sectors),
+        "share_sectors": agg["sectors"][in_range[ascending]].tolist(),
+        "shares": shares[ascending],
+        "sector_order": agg["sectors"][in_range[descending]].tolist(),
+        "series": series,
+    }
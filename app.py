@@ -1,30 +1,25 @@
-import pandas as pd
-import plotly.express as px
-from dash import Dash, dcc, html, Input, Output, dash_table
+from dash import Dash, dcc, html, Input, Output, State, ctx, dash_table
+from dash.exceptions import PreventUpdate
+
+from datastore import has_table_rows
+from compression import install as install_compression
+from figures import build_comparison_figures, figure_template
+from metrics import install as install_metrics, timed, timed_callback
+from refresh import snapshot_loader
+from table_query import query_table, table_page
 
 # ------------------------------------------------------------
-# 1. LOAD + FILTER DATA
+# 1. LOAD DATA
 # ------------------------------------------------------------
-df = pd.read_csv("country_inventory_global_co2e_100yr.csv")
-
-countries = [
-    "AGO","ARG","AUS","AUT","AZE","BHR","BGD","BRB","BEL","BRA","CAN","CHL",
-    "CHN","COL","CRI","CYP","CZE","DNK","DOM","EGY","EST","FIN","FRA","DEU",
-    "HKG","HUN","IND","IDN","IRL","ISR","ITA","JPN","KAZ","KEN","LVA","LTU",
-    "LUX","MYS","MLT","MEX","MAR","NLD","NZL","NGA","NOR","OMN","PAN","PER",
-    "PHL","POL","PRT","QAT","KOR","ROU","RUS","SAU","SRB","SGP","SVK","SVN",
-    "ZAF","ESP","SWE","CHE","THA","TUR","ARE","GBR","USA","URY","ECU","SLV",
-    "GHA","JAM","JOR","KWT","PAK","PRY","LKA","UKR","VNM","HRV","UGA","GRC","BGR"
-]
-
-df = df[df["iso3_country"].isin(countries)]
-latest_year = df["year"].max()
+# Data comes from the columnar store built by datastore.py. The store and
+# its cached loaders (country partitions, descriptions, figures and the
+# comparison cube) form a snapshot; when the CSVs change, a background
+# thread swaps in a new one (see refresh.py). Callbacks take the current
+# snapshot once and read everything from it.
+current_snapshot = snapshot_loader()
 
-# Load country info dataset
-df_country_info = pd.read_csv("updated_IEA.csv")
-
-# Load government fiscal measures dataset
-df_fiscal = pd.read_csv("merged.csv")
+# Rows per page of the policy tables; only the visible page is sent
+TABLE_PAGE_SIZE = 20
 
 # ------------------------------------------------------------
 # 2. DASH APP
@@ -32,452 +27,575 @@ df_fiscal = pd.read_csv("merged.csv")
 
 app = Dash(__name__)
 server = app.server
-app.layout = html.Div(
-    style={
-        "maxWidth": "1400px",
-        "margin": "20px auto",
-        "padding": "0 20px",
-        "fontFamily": "Arial, sans-serif"
-    },
-    children=[
-
-        html.H2(
-            "Country Emissions Dashboard",
-            style={"marginBottom": "10px", "color": "#2c3e50"}
-        ),
-
-        dcc.Dropdown(
-            id="country-dropdown",
-            options=[
-                {"label": c, "value": c}
-                for c in sorted(df["iso3_country"].unique())
-            ],
-            value="CHN",
-            clearable=False,
-            style={"width": "300px", "marginBottom": "15px"}
-        ),
-
-        # ----------------------------------------------------
-        # TOP ROW: COUNTRY INFO (RIGHT) + SECTOR CHART (LEFT)
-        # ----------------------------------------------------
-        html.Div(
-            style={"display": "flex", "gap": "15px", "marginBottom": "15px"},
-            children=[
-                # LEFT: Sector share bar
-                html.Div(
-                    style={"flex": "1"},
-                    children=[dcc.Graph(id="sector-share-bar", style={"height": "400px"})]
-                ),
+
+# The refresh thread runs in the process serving requests (each worker
+# under gunicorn), never in a preloading master; see wsgi.py
+server.before_request(current_snapshot.start)
+
+# Callback timings, payload sizes and cache hit rates at /metrics
+install_metrics(app, current_snapshot)
+
+# gzip for JSON and text responses
+install_compression(server)
+
+
+def serve_layout():
+    """The page layout, built per page load so new countries and years show up."""
+    store = current_snapshot()["store"]
+    countries = store["countries"]
+    first_year, latest_year = store["first_year"], store["latest_year"]
+
+    return html.Div(
+        style={
+            "maxWidth": "1400px",
+            "margin": "20px auto",
+            "padding": "0 20px",
+            "fontFamily": "Arial, sans-serif"
+        },
+        children=[
+
+            html.H2(
+                "Country Emissions Dashboard",
+                style={"marginBottom": "10px", "color": "#2c3e50"}
+            ),
+
+            # Figures arrive without their Plotly template; the page holds
+            # it once and applies it in the browser
+            dcc.Store(id="figure-template", data=figure_template()),
+            dcc.Store(id="country-figures"),
+            dcc.Store(id="comparison-figures"),
+
+            dcc.Dropdown(
+                id="country-dropdown",
+                options=[
+                    {"label": c, "value": c}
+                    for c in countries
+                ],
+                value="CHN",
+                clearable=False,
+                style={"width": "300px", "marginBottom": "15px"}
+            ),
+
+            # Year range and sector drill-down for the country charts
+            html.Div(
+                style={"display": "flex", "gap": "15px", "alignItems": "center", "marginBottom": "15px"},
+                children=[
+                    html.Div(
+                        style={"flex": "2"},
+                        children=[
+                            dcc.RangeSlider(
+                                id="year-range",
+                                min=first_year,
+                                max=latest_year,
+                                step=1,
+                                value=[first_year, latest_year],
+                                marks={
+                                    year: str(year)
+                                    for year in range(first_year, latest_year + 1)
+                                    if (latest_year - year) % 5 == 0 or year == first_year
+                                },
+                                allowCross=False
+                            )
+                        ]
+                    ),
+                    html.Div(
+                        style={"flex": "1"},
+                        children=[
+                            dcc.Dropdown(
+                                id="sector-dropdown",
+                                options=[
+                                    {"label": s, "value": s}
+                                    for s in store["sectors"]
+                                ],
+                                value=[],
+                                multi=True,
+                                placeholder="Top 5 sectors"
+                            )
+                        ]
+                    ),
+                ]
+            ),
+
+            # ----------------------------------------------------
+            # TOP ROW: COUNTRY INFO (RIGHT) + SECTOR CHART (LEFT)
+            # ----------------------------------------------------
+            html.Div(
+                style={"display": "flex", "gap": "15px", "marginBottom": "15px"},
+                children=[
+                    # LEFT: Sector share bar
+                    html.Div(
+                        style={"flex": "1"},
+                        children=[dcc.Graph(id="sector-share-bar", style={"height": "400px"})]
+                    ),
                 
-                # RIGHT: Country info table
-                html.Div(
-                    style={"flex": "1"},
-                    children=[
-                        html.Div(
-                            style={
-                                "padding": "15px",
-                                "backgroundColor": "#f8f9fa",
-                                "borderRadius": "5px",
-                                "border": "1px solid #dee2e6",
-                                "display": "flex",
-                                "flexDirection": "column"
-                            },
-                            children=[
-                                html.H4("Country Information", style={"marginTop": "0", "marginBottom": "10px", "color": "#2c3e50", "fontSize": "14px"}),
+                    # RIGHT: Country info table
+                    html.Div(
+                        style={"flex": "1"},
+                        children=[
+                            html.Div(
+                                style={
+                                    "padding": "15px",
+                                    "backgroundColor": "#f8f9fa",
+                                    "borderRadius": "5px",
+                                    "border": "1px solid #dee2e6",
+                                    "display": "flex",
+                                    "flexDirection": "column"
+                                },
+                                children=[
+                                    html.H4("Country Information", style={"marginTop": "0", "marginBottom": "10px", "color": "#2c3e50", "fontSize": "14px"}),
                                 
-                                # Clickable titles table
-                                dash_table.DataTable(
-                                    id="country-info-table",
-                                    style_cell={
-                                        "textAlign": "left",
-                                        "padding": "8px",
-                                        "fontFamily": "Arial, sans-serif",
-                                        "fontSize": "13px",
-                                        "cursor": "pointer",
-                                        "whiteSpace": "normal",
-                                        "height": "auto"
-                                    },
-                                    style_cell_conditional=[
-                                        {
-                                            "if": {"column_id": "title"},
-                                            "maxWidth": "250px",
-                                            "overflow": "hidden",
-                                            "textOverflow": "ellipsis"
+                                    # Clickable titles table
+                                    dash_table.DataTable(
+                                        id="country-info-table",
+                                        style_cell={
+                                            "textAlign": "left",
+                                            "padding": "8px",
+                                            "fontFamily": "Arial, sans-serif",
+                                            "fontSize": "13px",
+                                            "cursor": "pointer",
+                                            "whiteSpace": "normal",
+                                            "height": "auto"
                                         },
-                                        {
-                                            "if": {"column_id": "status"},
-                                            "width": "100px"
-                                        }
-                                    ],
-                                    style_header={
-                                        "backgroundColor": "#2c3e50",
-                                        "color": "white",
-                                        "fontWeight": "bold",
-                                        "fontSize": "13px"
-                                    },
-                                    style_data={
-                                        "backgroundColor": "white",
-                                        "border": "1px solid #dee2e6",
-                                        "whiteSpace": "normal",
-                                        "height": "auto"
-                                    },
-                                    style_data_conditional=[
-                                        {
-                                            "if": {"state": "active"},
-                                            "backgroundColor": "#e3f2fd",
-                                            "border": "1px solid #2196f3"
-                                        }
-                                    ],
-                                    style_table={
-                                        "maxHeight": "180px",
-                                        "overflowY": "auto",
-                                        "overflowX": "auto"
-                                    },
-                                    page_action="none",
-                                    tooltip_data=[],
-                                    tooltip_duration=None
-                                ),
+                                        style_cell_conditional=[
+                                            {
+                                                "if": {"column_id": "title"},
+                                                "maxWidth": "250px",
+                                                "overflow": "hidden",
+                                                "textOverflow": "ellipsis"
+                                            },
+                                            {
+                                                "if": {"column_id": "status"},
+                                                "width": "100px"
+                                            }
+                                        ],
+                                        style_header={
+                                            "backgroundColor": "#2c3e50",
+                                            "color": "white",
+                                            "fontWeight": "bold",
+                                            "fontSize": "13px"
+                                        },
+                                        style_data={
+                                            "backgroundColor": "white",
+                                            "border": "1px solid #dee2e6",
+                                            "whiteSpace": "normal",
+                                            "height": "auto"
+                                        },
+                                        style_data_conditional=[
+                                            {
+                                                "if": {"state": "active"},
+                                                "backgroundColor": "#e3f2fd",
+                                                "border": "1px solid #2196f3"
+                                            }
+                                        ],
+                                        style_table={
+                                            "maxHeight": "180px",
+                                            "overflowY": "auto",
+                                            "overflowX": "auto"
+                                        },
+                                        # Paging, sorting and filtering run server-side
+                                        page_action="custom",
+                                        page_current=0,
+                                        page_size=TABLE_PAGE_SIZE,
+                                        sort_action="custom",
+                                        sort_by=[],
+                                        filter_action="custom",
+                                        filter_query="",
+                                        filter_options={"case": "insensitive"},
+                                        tooltip_data=[],
+                                        tooltip_duration=None
+                                    ),
                                 
-                                # Description display area
-                                html.Div(
-                                    id="description-display",
-                                    style={
-                                        "marginTop": "15px",
-                                        "padding": "12px",
-                                        "backgroundColor": "white",
-                                        "borderRadius": "4px",
-                                        "border": "1px solid #dee2e6",
-                                        "flex": "1",
-                                        "fontSize": "13px",
-                                        "color": "#495057",
-                                        "overflowY": "auto"
-                                    }
-                                )
-                            ]
-                        )
-                    ]
-                ),
-            ]
-        ),
-
-        # ----------------------------------------------------
-        # MIDDLE ROW: EMISSIONS TRENDS + FISCAL MEASURES
-        # ----------------------------------------------------
-        html.Div(
-            style={"display": "flex", "gap": "15px", "marginTop": "15px"},
-            children=[
-                html.Div(
-                    style={"flex": "1"},
-                    children=[dcc.Graph(id="emissions-trends-absolute", style={"height": "400px"})]
-                ),
+                                    # Description display area
+                                    html.Div(
+                                        id="description-display",
+                                        style={
+                                            "marginTop": "15px",
+                                            "padding": "12px",
+                                            "backgroundColor": "white",
+                                            "borderRadius": "4px",
+                                            "border": "1px solid #dee2e6",
+                                            "flex": "1",
+                                            "fontSize": "13px",
+                                            "color": "#495057",
+                                            "overflowY": "auto"
+                                        }
+                                    )
+                                ]
+                            )
+                        ]
+                    ),
+                ]
+            ),
+
+            # ----------------------------------------------------
+            # MIDDLE ROW: EMISSIONS TRENDS + FISCAL MEASURES
+            # ----------------------------------------------------
+            html.Div(
+                style={"display": "flex", "gap": "15px", "marginTop": "15px"},
+                children=[
+                    html.Div(
+                        style={"flex": "1"},
+                        children=[dcc.Graph(id="emissions-trends-absolute", style={"height": "400px"})]
+                    ),
                 
-                # Government Fiscal Measures
-                html.Div(
-                    style={"flex": "1"},
-                    children=[
-                        html.Div(
-                            style={
-                                "padding": "15px",
-                                "backgroundColor": "#f8f9fa",
-                                "borderRadius": "5px",
-                                "border": "1px solid #dee2e6",
-                                "display": "flex",
-                                "flexDirection": "column"
-                            },
-                            children=[
-                                html.H4("Government Fiscal Measures", style={"marginTop": "0", "marginBottom": "10px", "color": "#2c3e50", "fontSize": "14px"}),
+                    # Government Fiscal Measures
+                    html.Div(
+                        style={"flex": "1"},
+                        children=[
+                            html.Div(
+                                style={
+                                    "padding": "15px",
+                                    "backgroundColor": "#f8f9fa",
+                                    "borderRadius": "5px",
+                                    "border": "1px solid #dee2e6",
+                                    "display": "flex",
+                                    "flexDirection": "column"
+                                },
+                                children=[
+                                    html.H4("Government Fiscal Measures", style={"marginTop": "0", "marginBottom": "10px", "color": "#2c3e50", "fontSize": "14px"}),
                                 
-                                # Fiscal measures table
-                                dash_table.DataTable(
-                                    id="fiscal-measures-table",
-                                    style_cell={
-                                        "textAlign": "left",
-                                        "padding": "8px",
-                                        "fontFamily": "Arial, sans-serif",
-                                        "fontSize": "13px",
-                                        "cursor": "pointer",
-                                        "whiteSpace": "normal",
-                                        "height": "auto"
-                                    },
-                                    style_cell_conditional=[
-                                        {
-                                            "if": {"column_id": "matched_title"},
-                                            "maxWidth": "250px",
-                                            "overflow": "hidden",
-                                            "textOverflow": "ellipsis"
+                                    # Fiscal measures table
+                                    dash_table.DataTable(
+                                        id="fiscal-measures-table",
+                                        style_cell={
+                                            "textAlign": "left",
+                                            "padding": "8px",
+                                            "fontFamily": "Arial, sans-serif",
+                                            "fontSize": "13px",
+                                            "cursor": "pointer",
+                                            "whiteSpace": "normal",
+                                            "height": "auto"
                                         },
-                                        {
-                                            "if": {"column_id": "budget_commitment"},
-                                            "width": "120px"
-                                        }
-                                    ],
-                                    style_header={
-                                        "backgroundColor": "#2c3e50",
-                                        "color": "white",
-                                        "fontWeight": "bold",
-                                        "fontSize": "13px"
-                                    },
-                                    style_data={
-                                        "backgroundColor": "white",
-                                        "border": "1px solid #dee2e6",
-                                        "whiteSpace": "normal",
-                                        "height": "auto"
-                                    },
-                                    style_data_conditional=[
-                                        {
-                                            "if": {"state": "active"},
-                                            "backgroundColor": "#e3f2fd",
-                                            "border": "1px solid #2196f3"
-                                        }
-                                    ],
-                                    style_table={
-                                        "maxHeight": "180px",
-                                        "overflowY": "auto",
-                                        "overflowX": "auto"
-                                    },
-                                    page_action="none",
-                                    tooltip_data=[],
-                                    tooltip_duration=None
-                                ),
+                                        style_cell_conditional=[
+                                            {
+                                                "if": {"column_id": "matched_title"},
+                                                "maxWidth": "250px",
+                                                "overflow": "hidden",
+                                                "textOverflow": "ellipsis"
+                                            },
+                                            {
+                                                "if": {"column_id": "budget_commitment"},
+                                                "width": "120px"
+                                            }
+                                        ],
+                                        style_header={
+                                            "backgroundColor": "#2c3e50",
+                                            "color": "white",
+                                            "fontWeight": "bold",
+                                            "fontSize": "13px"
+                                        },
+                                        style_data={
+                                            "backgroundColor": "white",
+                                            "border": "1px solid #dee2e6",
+                                            "whiteSpace": "normal",
+                                            "height": "auto"
+                                        },
+                                        style_data_conditional=[
+                                            {
+                                                "if": {"state": "active"},
+                                                "backgroundColor": "#e3f2fd",
+                                                "border": "1px solid #2196f3"
+                                            }
+                                        ],
+                                        style_table={
+                                            "maxHeight": "180px",
+                                            "overflowY": "auto",
+                                            "overflowX": "auto"
+                                        },
+                                        # Paging, sorting and filtering run server-side
+                                        page_action="custom",
+                                        page_current=0,
+                                        page_size=TABLE_PAGE_SIZE,
+                                        sort_action="custom",
+                                        sort_by=[],
+                                        filter_action="custom",
+                                        filter_query="",
+                                        filter_options={"case": "insensitive"},
+                                        tooltip_data=[],
+                                        tooltip_duration=None
+                                    ),
                                 
-                                # Fiscal description display area
-                                html.Div(
-                                    id="fiscal-description-display",
-                                    style={
-                                        "marginTop": "15px",
-                                        "padding": "12px",
-                                        "backgroundColor": "white",
-                                        "borderRadius": "4px",
-                                        "border": "1px solid #dee2e6",
-                                        "flex": "1",
-                                        "fontSize": "13px",
-                                        "color": "#495057",
-                                        "overflowY": "auto"
-                                    }
-                                )
-                            ]
-                        )
-                    ]
-                ),
-            ]
-        ),
-
-        # ----------------------------------------------------
-        # BOTTOM ROW: EMISSIONS STRUCTURE (FULL WIDTH)
-        # ----------------------------------------------------
-        html.Div(
-            style={"marginTop": "15px"},
-            children=[dcc.Graph(id="emissions-structure-ordered", style={"height": "400px"})]
-        )
-    ]
-)
+                                    # Fiscal description display area
+                                    html.Div(
+                                        id="fiscal-description-display",
+                                        style={
+                                            "marginTop": "15px",
+                                            "padding": "12px",
+                                            "backgroundColor": "white",
+                                            "borderRadius": "4px",
+                                            "border": "1px solid #dee2e6",
+                                            "flex": "1",
+                                            "fontSize": "13px",
+                                            "color": "#495057",
+                                            "overflowY": "auto"
+                                        }
+                                    )
+                                ]
+                            )
+                        ]
+                    ),
+                ]
+            ),
+
+            # ----------------------------------------------------
+            # BOTTOM ROW: EMISSIONS STRUCTURE (FULL WIDTH)
+            # ----------------------------------------------------
+            html.Div(
+                style={"marginTop": "15px"},
+                children=[dcc.Graph(id="emissions-structure-ordered", style={"height": "400px"})]
+            ),
+
+            # ----------------------------------------------------
+            # COMPARISON: SEVERAL COUNTRIES SIDE BY SIDE
+            # ----------------------------------------------------
+            html.H3(
+                "Compare Countries",
+                style={"marginTop": "30px", "marginBottom": "10px", "color": "#2c3e50"}
+            ),
+
+            dcc.Dropdown(
+                id="compare-dropdown",
+                options=[
+                    {"label": c, "value": c}
+                    for c in countries
+                ],
+                value=[],
+                multi=True,
+                placeholder="Select countries to compare",
+                style={"marginBottom": "15px"}
+            ),
+
+            html.Div(
+                style={"display": "flex", "gap": "15px"},
+                children=[
+                    html.Div(
+                        style={"flex": "1"},
+                        children=[dcc.Graph(id="compare-sector-bar", style={"height": "450px"})]
+                    ),
+                    html.Div(
+                        style={"flex": "1"},
+                        children=[dcc.Graph(id="compare-trends", style={"height": "450px"})]
+                    ),
+                ]
+            ),
+
+            html.Div(
+                style={"marginTop": "15px"},
+                children=[dcc.Graph(id="compare-structure", style={"height": "400px"})]
+            )
+        ]
+    )
+
+
+app.layout = serve_layout
 
 # ------------------------------------------------------------
-# 3. CALLBACK
+# 3. CALLBACKS
 # ------------------------------------------------------------
+# The callback graph is split by dependency: a country change rebuilds the
+# tables and the figures, a page/sort/filter change only queries its own
+# table, and a row click only fetches the one description it shows.
+
+def _snapshot_for(country):
+    """The current snapshot; stops the callback for a country it does not hold.
+
+    The country comes from the client, so it is checked before it reaches
+    any cached loader.
+    """
+    snapshot = current_snapshot()
+    if country not in snapshot["store"]["countries"]:
+        raise PreventUpdate
+    return snapshot
+
+
+def _policy_table_page(table, page_current, page_size, sort_by, filter_query):
+    """Query one page of a country's policy table.
+
+    A new country, sort order or filter starts again at page 0.
+    """
+    changed = {prop_id.rsplit(".", 1)[-1] for prop_id in ctx.triggered_prop_ids}
+    if ctx.triggered_id == "country-dropdown" or changed & {"sort_by", "filter_query"}:
+        page_current = 0
+
+    with timed("table_query"):
+        rows, page_current, page_count = query_table(table, page_current, page_size, sort_by, filter_query)
+        data, tooltip_data = table_page(table, rows)
+
+    return data, tooltip_data, page_current, page_count
+
 
 @app.callback(
     Output("country-info-table", "data"),
     Output("country-info-table", "columns"),
     Output("country-info-table", "tooltip_data"),
-    Output("description-display", "children"),
+    Output("country-info-table", "active_cell"),
+    Output("country-info-table", "page_current"),
+    Output("country-info-table", "page_count"),
+    Input("country-dropdown", "value"),
+    Input("country-info-table", "page_current"),
+    Input("country-info-table", "page_size"),
+    Input("country-info-table", "sort_by"),
+    Input("country-info-table", "filter_query")
+)
+@timed_callback
+def update_country_info(country, page_current, page_size, sort_by, filter_query):
+
+    # Rows and tooltips are prebuilt per country by datastore.py
+    with timed("partition"):
+        country_info = _snapshot_for(country)["load_partition"](country, "country_info")
+
+    table_columns = [
+        {"name": "Title", "id": "title"},
+        {"name": "Status", "id": "status"}
+    ]
+
+    if not country_info["data"]:
+        table_data = [{"title": "No data available", "status": "N/A"}]
+        return table_data, table_columns, [], None, 0, 1
+
+    table_data, tooltip_data, page_current, page_count = _policy_table_page(
+        country_info, page_current, page_size, sort_by, filter_query
+    )
+
+    return table_data, table_columns, tooltip_data, None, page_current, page_count
+
+
+@app.callback(
     Output("fiscal-measures-table", "data"),
     Output("fiscal-measures-table", "columns"),
     Output("fiscal-measures-table", "tooltip_data"),
-    Output("fiscal-description-display", "children"),
-    Output("sector-share-bar", "figure"),
-    Output("emissions-trends-absolute", "figure"),
-    Output("emissions-structure-ordered", "figure"),
+    Output("fiscal-measures-table", "active_cell"),
+    Output("fiscal-measures-table", "page_current"),
+    Output("fiscal-measures-table", "page_count"),
     Input("country-dropdown", "value"),
-    Input("country-info-table", "active_cell"),
-    Input("fiscal-measures-table", "active_cell")
+    Input("fiscal-measures-table", "page_current"),
+    Input("fiscal-measures-table", "page_size"),
+    Input("fiscal-measures-table", "sort_by"),
+    Input("fiscal-measures-table", "filter_query")
 )
-def update_dashboard(country, active_cell, fiscal_active_cell):
-
-    # ------------------------
-    # Country Info Table
-    # ------------------------
-    country_info = df_country_info[df_country_info["iso3"] == country]
-    
-    if not country_info.empty:
-        table_data = country_info[["title", "status"]].to_dict("records")
-        table_columns = [
-            {"name": "Title", "id": "title"},
-            {"name": "Status", "id": "status"}
-        ]
-        
-        # Add tooltips for full title text
-        tooltip_data = [
-            {
-                "title": {"value": row["title"], "type": "markdown"}
-            }
-            for _, row in country_info.iterrows()
-        ]
-        
-        # Display description based on clicked row
-        if active_cell and active_cell["row"] < len(country_info):
-            row_idx = active_cell["row"]
-            description = country_info.iloc[row_idx]["description"]
-            description_display = html.Div([
-                html.Strong("Description: ", style={"color": "#2c3e50"}),
-                html.Span(description if pd.notna(description) else "No description available")
-            ])
-        else:
-            description_display = html.Div(
-                "Click on a row to view its description",
-                style={"fontStyle": "italic", "color": "#6c757d"}
-            )
-    else:
-        table_data = [{"title": "No data available", "status": "N/A"}]
-        table_columns = [
-            {"name": "Title", "id": "title"},
-            {"name": "Status", "id": "status"}
-        ]
-        tooltip_data = []
-        description_display = html.Div(
-            "No information available for this country",
-            style={"fontStyle": "italic", "color": "#6c757d"}
-        )
+@timed_callback
+def update_fiscal_measures(country, page_current, page_size, sort_by, filter_query):
 
-    # ------------------------
-    # Government Fiscal Measures Table
-    # ------------------------
-    fiscal_info = df_fiscal[df_fiscal["iso3"] == country]
-    
-    if not fiscal_info.empty:
-        fiscal_table_data = fiscal_info[["matched_title", "budget_commitment"]].to_dict("records")
-        fiscal_table_columns = [
-            {"name": "Measure Title", "id": "matched_title"},
-            {"name": "Budget Commitment", "id": "budget_commitment"}
-        ]
-        
-        # Add tooltips for full title text
-        fiscal_tooltip_data = [
-            {
-                "matched_title": {"value": row["matched_title"], "type": "markdown"}
-            }
-            for _, row in fiscal_info.iterrows()
-        ]
-        
-        # Display description based on clicked row
-        if fiscal_active_cell and fiscal_active_cell["row"] < len(fiscal_info):
-            row_idx = fiscal_active_cell["row"]
-            fiscal_description = fiscal_info.iloc[row_idx]["description"]
-            fiscal_description_display = html.Div([
-                html.Strong("Description: ", style={"color": "#2c3e50"}),
-                html.Span(fiscal_description if pd.notna(fiscal_description) else "No description available")
-            ])
-        else:
-            fiscal_description_display = html.Div(
-                "Click on a row to view its description",
-                style={"fontStyle": "italic", "color": "#6c757d"}
-            )
-    else:
-        fiscal_table_data = [{"matched_title": "No fiscal measures available", "budget_commitment": "N/A"}]
-        fiscal_table_columns = [
-            {"name": "Measure Title", "id": "matched_title"},
-            {"name": "Budget Commitment", "id": "budget_commitment"}
-        ]
-        fiscal_tooltip_data = []
-        fiscal_description_display = html.Div(
-            "No fiscal measures available for this country",
-            style={"fontStyle": "italic", "color": "#6c757d"}
-        )
+    with timed("partition"):
+        fiscal_info = _snapshot_for(country)["load_partition"](country, "fiscal")
 
-    # ------------------------
-    # Emissions Data
-    # ------------------------
-    df_country = df[df["iso3_country"] == country]
+    fiscal_table_columns = [
+        {"name": "Measure Title", "id": "matched_title"},
+        {"name": "Budget Commitment", "id": "budget_commitment"}
+    ]
 
-    # ------------------------
-    # Chart 1: Sector share bar
-    # ------------------------
-    df_latest = df_country[df_country["year"] == latest_year]
+    if not fiscal_info["data"]:
+        fiscal_table_data = [{"matched_title": "No fiscal measures available", "budget_commitment": "N/A"}]
+        return fiscal_table_data, fiscal_table_columns, [], None, 0, 1
 
-    sector_latest = (
-        df_latest.groupby("sector", as_index=False)
-                 .agg(emissions=("emissions", "sum"))
+    fiscal_table_data, fiscal_tooltip_data, page_current, page_count = _policy_table_page(
+        fiscal_info, page_current, page_size, sort_by, filter_query
     )
 
-    sector_latest["share"] = (
-        sector_latest["emissions"] / sector_latest["emissions"].sum()
-    )
+    return fiscal_table_data, fiscal_table_columns, fiscal_tooltip_data, None, page_current, page_count
 
-    sector_latest = sector_latest.sort_values("share")
 
-    fig1 = px.bar(
-        sector_latest,
-        x="share",
-        y="sector",
-        orientation="h",
-        title=f"{country}: Emissions by Sector ({latest_year})",
-        labels={"share": "Share of national emissions", "sector": "Sector"}
-    )
+def _description_panel(table, active_cell, country, empty_message):
+    """The description of the clicked row, or a hint when there is none.
 
-    fig1.update_xaxes(tickformat=".0%")
-    fig1.update_layout(margin=dict(l=20, r=20, t=40, b=20), title_font_size=14)
+    Rows carry stable ids, so the click resolves through ``row_id``
+    whatever the table's sort order or page.
+    """
+    snapshot = _snapshot_for(country)
+    if not has_table_rows(snapshot["store"], table, country):
+        return html.Div(empty_message, style={"fontStyle": "italic", "color": "#6c757d"})
 
-    # ------------------------
-    # Top sectors
-    # ------------------------
-    top_sectors = (
-        sector_latest.sort_values("share", ascending=False)
-                     .head(5)["sector"]
-                     .tolist()
-    )
+    if not active_cell or active_cell.get("row_id") is None:
+        return html.Div(
+            "Click on a row to view its description",
+            style={"fontStyle": "italic", "color": "#6c757d"}
+        )
 
-    df_top = df_country[df_country["sector"].isin(top_sectors)]
+    with timed("description"):
+        description = snapshot["load_description"](table, active_cell["row_id"])
+    return html.Div([
+        html.Strong("Description: ", style={"color": "#2c3e50"}),
+        description if description is not None else html.Span("No description available")
+    ])
 
-    yearly_totals = (
-        df_top.groupby(["year", "sector"], as_index=False)
-              .agg(emissions=("emissions", "sum"))
-    )
 
-    # ------------------------
-    # Chart 2: Absolute trends
-    # ------------------------
-    fig2 = px.line(
-        yearly_totals,
-        x="year",
-        y="emissions",
-        color="sector",
-        title=f"{country}: Emissions Trends (Top 5 Sectors)",
-        labels={"emissions": "Emissions", "year": "Year", "sector": "Sector"}
-    )
-    
-    fig2.update_layout(margin=dict(l=20, r=20, t=40, b=20), title_font_size=14)
-
-    # ------------------------
-    # Chart 3: Structure (ordered)
-    # ------------------------
-    yearly_totals["year_total"] = (
-        yearly_totals.groupby("year")["emissions"].transform("sum")
+@app.callback(
+    Output("description-display", "children"),
+    Input("country-info-table", "active_cell"),
+    Input("country-dropdown", "value")
+)
+@timed_callback
+def update_description(active_cell, country):
+    return _description_panel(
+        "country_info", active_cell, country, "No information available for this country"
     )
 
-    yearly_totals["share"] = (
-        yearly_totals["emissions"] / yearly_totals["year_total"]
-    )
 
-    sector_order = (
-        sector_latest.sort_values("share", ascending=False)["sector"]
-                     .tolist()
+@app.callback(
+    Output("fiscal-description-display", "children"),
+    Input("fiscal-measures-table", "active_cell"),
+    Input("country-dropdown", "value")
+)
+@timed_callback
+def update_fiscal_description(active_cell, country):
+    return _description_panel(
+        "fiscal", active_cell, country, "No fiscal measures available for this country"
     )
 
-    fig3 = px.area(
-        yearly_totals,
-        x="year",
-        y="share",
-        color="sector",
-        groupnorm="fraction",
-        category_orders={"sector": sector_order},
-        title=f"{country}: Emissions Structure Over Time (Top 5 Sectors)",
-        labels={"share": "Share of emissions", "year": "Year", "sector": "Sector"}
-    )
 
-    fig3.update_yaxes(tickformat=".0%")
-    fig3.update_layout(margin=dict(l=20, r=20, t=40, b=20), title_font_size=14)
+@app.callback(
+    Output("country-figures", "data"),
+    Input("country-dropdown", "value"),
+    Input("year-range", "value"),
+    Input("sector-dropdown", "value")
+)
+@timed_callback
+def update_figures(country, year_range, sectors):
+    return _snapshot_for(country)["load_figures"](country, year_range, sectors)
+
+
+@app.callback(
+    Output("comparison-figures", "data"),
+    Input("compare-dropdown", "value")
+)
+@timed_callback
+def update_comparison(selected):
+    with timed("compare"):
+        comparison = current_snapshot()["compare_countries"](selected or [])
+    with timed("build_figures"):
+        return build_comparison_figures(comparison)
+
+
+# Put the page's template back into each figure of a server response
+APPLY_TEMPLATE = """
+function(figures, template) {
+    if (!figures) {
+        throw window.dash_clientside.PreventUpdate;
+    }
+    return figures.map(function(figure) {
+        var layout = Object.assign({template: template}, figure.layout);
+        return Object.assign({}, figure, {layout: layout});
+    });
+}
+"""
+
+app.clientside_callback(
+    APPLY_TEMPLATE,
+    Output("sector-share-bar", "figure"),
+    Output("emissions-trends-absolute", "figure"),
+    Output("emissions-structure-ordered", "figure"),
+    Input("country-figures", "data"),
+    State("figure-template", "data")
+)
 
-    return table_data, table_columns, tooltip_data, description_display, fiscal_table_data, fiscal_table_columns, fiscal_tooltip_data, fiscal_description_display, fig1, fig2, fig3
+app.clientside_callback(
+    APPLY_TEMPLATE,
+    Output("compare-sector-bar", "figure"),
+    Output("compare-trends", "figure"),
+    Output("compare-structure", "figure"),
+    Input("comparison-figures", "data"),
+    State("figure-template", "data")
+)
 
 # ------------------------------------------------------------
 # 4. RUN APP
@@ -0,0 +1,386 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# ------------------------------------------------------------
+# CALLBACK BENCHMARK
+# ------------------------------------------------------------
+# Replays the dashboard's callbacks over every country and reports latency
+# percentiles, throughput and memory, so performance changes can be gated:
+#
+#   python synthetic_data.py /tmp/bench --scale 4
+#   python benchmark.py --data-dir /tmp/bench --mode http --json run.json
+#   python benchmark.py --data-dir /tmp/bench --baseline run.json
+#
+# Modes:
+#   direct  calls the callback functions in-process
+#   http    posts to /_dash-update-component through the Flask test client
+#   url     posts to a running server (--url), e.g. a local gunicorn
+#
+# Scenarios:
+#   country_switch  every callback a country change fires
+#   row_click       a description for each row of both tables' first page
+#   drill_down      figures for partial year ranges and sector selections
+#   compare         comparisons of successive groups of countries
+#
+# In-process modes run each scenario cold (all caches of the snapshot
+# cleared) and then warm; url mode can only measure the server as it is.
+# Callback inputs follow /_dash-dependencies and the layout, so split or
+# added callbacks are picked up as long as their outputs are listed in
+# CALLBACKS.
+
+# First output id of each callback -> its function in app.py (direct mode)
+CALLBACKS = {
+    "country-info-table": "update_country_info",
+    "fiscal-measures-table": "update_fiscal_measures",
+    "description-display": "update_description",
+    "fiscal-description-display": "update_fiscal_description",
+    "country-figures": "update_figures",
+    "comparison-figures": "update_comparison",
+}
+
+TABLES = {"country_info": "country-info-table", "fiscal": "fiscal-measures-table"}
+DESCRIPTIONS = {"country-info-table": "description-display", "fiscal-measures-table": "fiscal-description-display"}
+
+COMPARE_GROUP = 5
+
+
+def _rss_mb(pid="self"):
+    """Resident set size in MB of a process and its children, e.g. gunicorn's workers.
+
+    Pages shared between them count once per process. Off Linux only this
+    process's peak RSS is available.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:")) / 1024
+        task = os.getpid() if pid == "self" else pid
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            return rss + sum(_rss_mb(child) or 0 for child in f.read().split())
+    except FileNotFoundError:
+        pass
+    if pid != "self":
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def _find_props(node, component_id):
+    if isinstance(node, dict):
+        if node.get("props", {}).get("id") == component_id:
+            return node["props"]
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    for child in children:
+        found = _find_props(child, component_id)
+        if found is not None:
+            return found
+    return None
+
+
+# ------------------------------------------------------------
+# DRIVERS
+# ------------------------------------------------------------
+# A driver takes a callback's first output id, the input values by
+# (id, property) and the changed input, and returns the outputs as
+# {"<id>.<property>": value}.
+
+class _Driver:
+
+    def __init__(self, dependencies, layout):
+        self.dependencies = {
+            dep["output"].strip(".").split(".")[0]: dep
+            for dep in dependencies if not dep.get("clientside_function")
+        }
+        self.layout = layout
+
+    def _outputs(self, name):
+        return self.dependencies[name]["output"].strip(".").split("...")
+
+    def _inputs(self, name, values):
+        inputs = []
+        for item in self.dependencies[name]["inputs"]:
+            key = (item["id"], item["property"])
+            value = values[key] if key in values else (_find_props(self.layout, item["id"]) or {}).get(item["property"])
+            inputs.append(dict(item, value=value))
+        return inputs
+
+    def _body(self, name, values, changed):
+        outputs = self._outputs(name)
+        spec = [dict(zip(("id", "property"), o.split("."))) for o in outputs]
+        return {
+            "output": self.dependencies[name]["output"],
+            "outputs": spec if len(spec) > 1 else spec[0],
+            "inputs": self._inputs(name, values),
+            "changedPropIds": [".".join(changed)],
+            "state": [],
+        }
+
+    @staticmethod
+    def _flatten(response):
+        return {
+            f"{component}.{prop}": value
+            for component, props in response["response"].items()
+            for prop, value in props.items()
+        }
+
+
+class DirectDriver(_Driver):
+
+    def __init__(self, app):
+        client = app.server.test_client()
+        super().__init__(client.get("/_dash-dependencies").get_json(), client.get("/_dash-layout").get_json())
+        self.app = app
+
+    def __call__(self, name, values, changed):
+        from dash._callback_context import context_value
+        from dash._utils import AttributeDict
+
+        # The callbacks read ctx.triggered_id; give them what Dash would
+        inputs = self._inputs(name, values)
+        changed_value = next(i["value"] for i in inputs if (i["id"], i["property"]) == changed)
+        token = context_value.set(AttributeDict(
+            triggered_inputs=[{"prop_id": ".".join(changed), "value": changed_value}]
+        ))
+        try:
+            result = getattr(self.app, CALLBACKS[name])(*[i["value"] for i in inputs])
+        finally:
+            context_value.reset(token)
+
+        outputs = self._outputs(name)
+        return dict(zip(outputs, result if len(outputs) > 1 else [result]))
+
+
+class HttpDriver(_Driver):
+
+    def __init__(self, app):
+        self.client = app.server.test_client()
+        super().__init__(self.client.get("/_dash-dependencies").get_json(), self.client.get("/_dash-layout").get_json())
+
+    def __call__(self, name, values, changed):
+        response = self.client.post("/_dash-update-component", json=self._body(name, values, changed))
+        if response.status_code != 200:
+            raise RuntimeError(f"{name}: HTTP {response.status_code}")
+        return self._flatten(response.get_json())
+
+
+class UrlDriver(_Driver):
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        super().__init__(self._get("/_dash-dependencies"), self._get("/_dash-layout"))
+
+    def _get(self, path):
+        with urllib.request.urlopen(self.url + path) as response:
+            return json.load(response)
+
+    def __call__(self, name, values, changed):
+        request = urllib.request.Request(
+            self.url + "/_dash-update-component",
+            data=json.dumps(self._body(name, values, changed)).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request) as response:
+            return self._flatten(json.load(response))
+
+
+# ------------------------------------------------------------
+# SCENARIOS
+# ------------------------------------------------------------
+# Each scenario yields (callback, values, changed input) calls to time.
+
+def country_switch(driver, countries):
+    for country in countries:
+        values = {("country-dropdown", "value"): country}
+        for name, dep in driver.dependencies.items():
+            if any(i["id"] == "country-dropdown" for i in dep["inputs"]):
+                yield name, values, ("country-dropdown", "value")
+
+
+def row_click(driver, countries):
+    for country in countries:
+        for table in TABLES.values():
+            # The page itself is fetched untimed; only the clicks count
+            page = driver(table, {("country-dropdown", "value"): country}, ("country-dropdown", "value"))
+            for row, record in enumerate(page[f"{table}.data"]):
+                if "id" not in record:
+                    continue
+                active_cell = {"row": row, "column": 0, "column_id": "", "row_id": record["id"]}
+                yield DESCRIPTIONS[table], {
+                    (table, "active_cell"): active_cell,
+                    ("country-dropdown", "value"): country,
+                }, (table, "active_cell")
+
+
+def drill_down(driver, countries):
+    year_range = _find_props(driver.layout, "year-range")
+    first, last = year_range["min"], year_range["max"]
+    sectors = [option["value"] for option in _find_props(driver.layout, "sector-dropdown")["options"]]
+    views = [
+        ([last, last], []),
+        ([max(first, last - 4), last], []),
+        ([first, last], sectors[:2]),
+    ]
+    for country in countries:
+        for years, selected in views:
+            yield "country-figures", {
+                ("country-dropdown", "value"): country,
+                ("year-range", "value"): years,
+                ("sector-dropdown", "value"): selected,
+            }, ("year-range", "value")
+
+
+def compare(driver, countries):
+    for start in range(0, len(countries), COMPARE_GROUP):
+        group = countries[start:start + COMPARE_GROUP]
+        yield "comparison-figures", {("compare-dropdown", "value"): group}, ("compare-dropdown", "value")
+
+
+SCENARIOS = {
+    "country_switch": country_switch,
+    "row_click": row_click,
+    "drill_down": drill_down,
+    "compare": compare,
+}
+
+
+# ------------------------------------------------------------
+# RUN AND REPORT
+# ------------------------------------------------------------
+
+def run_calls(driver, calls, concurrency):
+    """Latencies (seconds) of the calls and the wall time they took."""
+    def timed_call(call):
+        start = time.perf_counter()
+        driver(*call)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(timed_call, calls))
+    else:
+        latencies = [timed_call(call) for call in calls]
+    return latencies, time.perf_counter() - start
+
+
+def summarize(latencies, wall, rss):
+    ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(ms),
+        "p50_ms": float(np.percentile(ms, 50)) if len(ms) else None,
+        "p95_ms": float(np.percentile(ms, 95)) if len(ms) else None,
+        "p99_ms": float(np.percentile(ms, 99)) if len(ms) else None,
+        "throughput_rps": len(ms) / wall if wall else None,
+        "rss_mb": rss,
+    }
+
+
+def clear_caches(app):
+    snapshot = app.current_snapshot()
+    for loader in ("load_partition", "load_description", "load_figures", "compare_countries"):
+        snapshot[loader].cache_clear()
+
+
+def benchmark(driver, countries, scenarios, repeat=1, concurrency=1, app=None, server_pid=None):
+    """Results keyed "<scenario>/<cold|warm>"."""
+    results = {}
+    for scenario in scenarios:
+        calls = list(SCENARIOS[scenario](driver, countries))
+        phases = ["cold", "warm"] if app is not None else ["warm"]
+        for phase in phases:
+            latencies, wall = [], 0.0
+            for _ in range(repeat if phase == "warm" else 1):
+                if phase == "cold":
+                    clear_caches(app)
+                run_latencies, run_wall = run_calls(driver, calls, concurrency)
+                latencies += run_latencies
+                wall += run_wall
+            rss = _rss_mb(server_pid) if server_pid else (_rss_mb() if app is not None else None)
+            results[f"{scenario}/{phase}"] = summarize(latencies, wall, rss)
+    return results
+
+
+def print_report(results):
+    print(f"{'scenario':<24}{'requests':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'RSS MB':>9}")
+    for key, r in results.items():
+        cells = [r["p50_ms"], r["p95_ms"], r["p99_ms"], r["throughput_rps"], r["rss_mb"]]
+        print(f"{key:<24}{r['requests']:>9}" + "".join(
+            f"{c:>9.1f}" if c is not None else f"{'-':>9}" for c in cells
+        ))
+
+
+def regressions(results, baseline, tolerance):
+    """Keys whose p95 latency grew by more than ``tolerance`` over the baseline."""
+    return [
+        key for key, r in results.items()
+        if key in baseline and r["p95_ms"] is not None and baseline[key]["p95_ms"]
+        and r["p95_ms"] > baseline[key]["p95_ms"] * (1 + tolerance)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard callbacks.")
+    parser.add_argument("--mode", choices=["direct", "http", "url"], default="http")
+    parser.add_argument("--url", default="http://127.0.0.1:8050", help="server for --mode url")
+    parser.add_argument("--server-pid", help="report the RSS of this process and its workers (--mode url)")
+    parser.add_argument("--data-dir", help="directory holding the input CSVs (in-process modes)")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="default: all")
+    parser.add_argument("--countries", type=int, help="only the first N countries")
+    parser.add_argument("--repeat", type=int, default=3, help="warm passes per scenario")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth over the baseline")
+    args = parser.parse_args(argv)
+    json_path, baseline_path = (
+        os.path.abspath(path) if path else None for path in (args.json, args.baseline)
+    )
+
+    app = None
+    if args.mode == "url":
+        driver = UrlDriver(args.url)
+    else:
+        if args.data_dir:
+            os.chdir(args.data_dir)
+        # The benchmark swaps nothing in; keep the refresh thread out of it
+        os.environ.setdefault("DASHBOARD_REFRESH_INTERVAL", "0")
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import app
+
+        driver = DirectDriver(app) if args.mode == "direct" else HttpDriver(app)
+
+    countries = [option["value"] for option in _find_props(driver.layout, "country-dropdown")["options"]]
+    countries = countries[:args.countries]
+
+    results = benchmark(
+        driver, countries, args.scenario or list(SCENARIOS),
+        repeat=args.repeat, concurrency=args.concurrency, app=app, server_pid=args.server_pid,
+    )
+    print_report(results)
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"mode": args.mode, "countries": len(countries), "results": results}, f, indent=2)
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            slower = regressions(results, json.load(f)["results"], args.tolerance)
+        if slower:
+            print(f"p95 regressions over {args.tolerance:.0%}: {', '.join(slower)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
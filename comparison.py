@@ -0,0 +1,109 @@
+import functools
+
+import numpy as np
+
+from datastore import single_flight
+
+# ------------------------------------------------------------
+# CROSS-COUNTRY COMPARISON ENGINE
+# ------------------------------------------------------------
+# The emissions cube of every country is scattered once into a dense
+# (country x year x sector) array. Comparing N countries is then a single
+# fancy-indexed slice of that array and a few vectorized reductions, rather
+# than N trips through the per-country path.
+
+
+def build_dense_cube(store):
+    """The store's emissions as a dense (country, year, sector) array.
+
+    Country/year/sector combinations absent from the inventory hold 0 and
+    are False in the matching ``present`` mask.
+    """
+    columns = store["columns"]
+    partitions = store["manifest"]["emissions"]["partitions"]
+    countries = store["countries"]
+
+    year = np.asarray(columns["year"])
+    years = np.unique(year)
+
+    country_pos = np.empty(len(year), dtype=np.intp)
+    for i, country in enumerate(countries):
+        start, stop = partitions[country]
+        country_pos[start:stop] = i
+
+    values = np.zeros((len(countries), len(years), len(store["sectors"])))
+    present = np.zeros(values.shape, dtype=bool)
+    cells = (country_pos, np.searchsorted(years, year), columns["sector"])
+    values[cells] = columns["emissions"]
+    present[cells] = True
+    values.flags.writeable = False
+    present.flags.writeable = False
+
+    return {
+        "countries": countries,
+        "country_index": {country: i for i, country in enumerate(countries)},
+        "years": years,
+        "sectors": store["sectors"],
+        "values": values,
+        "present": present,
+    }
+
+
+def compare(cube, countries, year):
+    """Vectorized comparison of several countries for the dashboard.
+
+    Returns the selected countries (unknown codes dropped, order kept), the
+    sectors any of them reports in ``year`` ordered by their combined
+    emissions, each country's emissions and share per sector in ``year``,
+    and each country's total emissions per year. As in
+    ``aggregates.select_view``, a sector is listed because it is present,
+    whatever the sign of its emissions (land use can be a net sink), and
+    shares are of the country's net total.
+    """
+    countries = [c for c in dict.fromkeys(countries) if c in cube["country_index"]]
+    rows = [cube["country_index"][c] for c in countries]
+    selected = cube["values"][rows]
+
+    year_pos = np.searchsorted(cube["years"], year)
+    if year_pos < len(cube["years"]) and cube["years"][year_pos] == year:
+        in_year = selected[:, year_pos, :]
+        present = cube["present"][rows, year_pos, :]
+    else:
+        in_year = np.zeros((len(countries), len(cube["sectors"])))
+        present = np.zeros(in_year.shape, dtype=bool)
+
+    combined = in_year.sum(axis=0)
+    sector_pos = np.argsort(-combined, kind="stable")
+    sector_pos = sector_pos[present.any(axis=0)[sector_pos]]
+    in_year = in_year[:, sector_pos]
+
+    country_total = in_year.sum(axis=1, keepdims=True)
+    shares = np.divide(
+        in_year, country_total,
+        out=np.zeros_like(in_year), where=country_total != 0
+    )
+
+    return {
+        "countries": countries,
+        "year": year,
+        "sectors": cube["sectors"][sector_pos].tolist(),
+        "emissions": in_year,
+        "shares": shares,
+        "years": cube["years"],
+        "totals": selected.sum(axis=2),
+    }
+
+
+def comparison_engine(store):
+    """Return ``compare(countries)`` for the store's latest year.
+
+    The dense cube is built on the first comparison and then reused;
+    ``compare_countries.cache_clear()`` drops it.
+    """
+    cube = single_flight(functools.lru_cache(maxsize=1)(lambda: build_dense_cube(store)))
+
+    def compare_countries(countries):
+        return compare(cube(), countries, store["latest_year"])
+
+    compare_countries.cache_clear = cube.cache_clear
+    return compare_countries
@@ -0,0 +1,50 @@
+import gzip
+import os
+
+from flask import request
+
+# ------------------------------------------------------------
+# RESPONSE COMPRESSION
+# ------------------------------------------------------------
+# Callback responses are JSON full of repeated keys and base64 arrays, and
+# compress several times over, as do the component bundles Dash serves (as
+# text/javascript). Responses of the types below are gzipped when the
+# client accepts it; anything already encoded, streamed or too small to
+# gain from it is sent as is.
+
+COMPRESS_MIN_SIZE = 500
+
+COMPRESS_LEVEL = int(os.environ.get("DASHBOARD_COMPRESS_LEVEL", "6"))
+
+COMPRESS_MIMETYPES = {
+    "application/json",
+    "application/javascript",
+    "text/javascript",
+    "text/html",
+    "text/css",
+    "text/plain",
+}
+
+
+def install(server):
+    """Gzip the Flask server's compressible responses."""
+
+    @server.after_request
+    def compress(response):
+        if (
+            response.mimetype not in COMPRESS_MIMETYPES
+            or response.direct_passthrough
+            or response.status_code < 200 or response.status_code == 204
+            or "Content-Encoding" in response.headers
+            or "gzip" not in request.headers.get("Accept-Encoding", "").lower()
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+
+        response.set_data(gzip.compress(data, compresslevel=COMPRESS_LEVEL))
+        response.headers["Content-Encoding"] = "gzip"
+        return response
@@ -0,0 +1,565 @@
+import contextlib
+import fcntl
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from aggregates import aggregate_country, build_emissions_cube
+from descriptions import render_description
+from table_query import build_sort_index
+
+# ------------------------------------------------------------
+# COLUMNAR DATA STORE
+# ------------------------------------------------------------
+# The source CSVs are converted once into a typed, country-partitioned store:
+#
+#   data_store/CURRENT                      name of the live snapshot
+#   data_store/.build.lock                  held while a snapshot is built
+#   data_store/<version>/manifest.json      partitions, vocabularies, sources
+#   data_store/<version>/emissions/*.npy    (country, year, sector) cube
+#   data_store/<version>/<table>/<ISO3>.json  table payload, one per country
+#   data_store/<version>/<table>/descriptions/<ISO3>.json  rendered, by row id
+#
+# The emissions cube is sorted by country, so every country is a contiguous
+# [start, stop) slice of each column. The .npy columns are memory-mapped,
+# which lets every gunicorn worker share the same page-cache pages instead
+# of parsing the CSVs into its own pandas copy. Policy tables are stored as
+# the ready-to-send DataTable payload (rows and tooltips), so serving a
+# country does no per-row work. Each payload also holds a sort index per
+# column for server-side sorting (see table_query.py). Descriptions are
+# sanitized and pre-rendered once (see descriptions.py) and kept apart from
+# the tables, since a click only ever needs one of them.
+#
+# Every policy row gets a stable id, "<ISO3>-<source id>", exposed as the
+# DataTable row "id" so clicks resolve by id whatever the sort or page.
+# Tables without a record id use a short hash of the row's title instead,
+# so ids (and the per-country digests) survive rows added elsewhere.
+#
+# Build it at deploy time with ``python datastore.py``; ``open_store`` also
+# (re)builds it when it is missing or older than the CSVs. Opening a store
+# only reads the manifest: each part of a country partition (its emissions
+# aggregates and each policy table) is loaded on first request, on its own
+# so independent panels do not wait for each other, and kept in a bounded
+# LRU (see ``partition_loader``).
+#
+# Builds are incremental. The manifest records a digest of every source
+# and of every country's rows in each policy table; parts whose digest
+# matches the current snapshot are hard-linked into the new one instead of
+# being rebuilt, so a data drop touching a few countries only re-renders
+# those. Snapshots are never modified once in place, and the oldest ones
+# beyond KEEP_SNAPSHOTS are pruned after each build.
+
+EMISSIONS_CSV = "country_inventory_global_co2e_100yr.csv"
+COUNTRY_INFO_CSV = "updated_IEA.csv"
+FISCAL_CSV = "merged.csv"
+
+SOURCES = {
+    "emissions": EMISSIONS_CSV,
+    "country_info": COUNTRY_INFO_CSV,
+    "fiscal": FISCAL_CSV,
+}
+
+STORE_DIR = "data_store"
+
+# Bumped whenever the snapshot layout changes, so old snapshots are rebuilt
+STORE_FORMAT = 8
+
+# Snapshots kept on disk, so workers still serving an older one can finish
+KEEP_SNAPSHOTS = int(os.environ.get("DASHBOARD_KEEP_SNAPSHOTS", "3"))
+
+# Number of loaded country partitions kept in memory per process
+# (counted in whole partitions, though each part is cached on its own)
+PARTITION_CACHE_SIZE = int(os.environ.get("DASHBOARD_PARTITION_CACHE_SIZE", "32"))
+
+# Number of (table, country) description lists kept in memory per process
+DESCRIPTION_CACHE_SIZE = int(os.environ.get("DASHBOARD_DESCRIPTION_CACHE_SIZE", "64"))
+
+COUNTRIES = [
+    "AGO","ARG","AUS","AUT","AZE","BHR","BGD","BRB","BEL","BRA","CAN","CHL",
+    "CHN","COL","CRI","CYP","CZE","DNK","DOM","EGY","EST","FIN","FRA","DEU",
+    "HKG","HUN","IND","IDN","IRL","ISR","ITA","JPN","KAZ","KEN","LVA","LTU",
+    "LUX","MYS","MLT","MEX","MAR","NLD","NZL","NGA","NOR","OMN","PAN","PER",
+    "PHL","POL","PRT","QAT","KOR","ROU","RUS","SAU","SRB","SGP","SVK","SVN",
+    "ZAF","ESP","SWE","CHE","THA","TUR","ARE","GBR","USA","URY","ECU","SLV",
+    "GHA","JAM","JOR","KWT","PAK","PRY","LKA","UKR","VNM","HRV","UGA","GRC","BGR"
+]
+
+# DataTable columns of each policy table, the column shown in full as a
+# tooltip and the source column holding a record id (None: a hash of the
+# row's title). Every table also has a "description" per row.
+TABLES = {
+    "country_info": {"columns": ["title", "status"], "tooltip": "title", "id": None},
+    "fiscal": {"columns": ["matched_title", "budget_commitment"], "tooltip": "matched_title", "id": "Unnamed: 0"},
+}
+
+EMISSIONS_DTYPES = {
+    "year": np.int16,
+    "sector": np.int16,
+    "emissions": np.float64,
+}
+
+
+# ------------------------------------------------------------
+# BUILD
+# ------------------------------------------------------------
+
+def _file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_stats():
+    return {
+        name: {"mtime": os.stat(path).st_mtime, "size": os.stat(path).st_size}
+        for name, path in SOURCES.items()
+    }
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _reuse(previous_dir, snapshot_dir, path):
+    """Carry a file or directory over from the previous snapshot."""
+    src, dst = os.path.join(previous_dir, path), os.path.join(snapshot_dir, path)
+    if os.path.isdir(src):
+        shutil.copytree(src, dst, copy_function=_link_or_copy)
+    else:
+        _link_or_copy(src, dst)
+
+
+def _write_emissions(snapshot_dir):
+    df = pd.read_csv(
+        EMISSIONS_CSV,
+        usecols=["iso3_country", "year", "sector", "emissions"],
+        dtype={"iso3_country": "string", "sector": "string"}
+    )
+    df = df[df["iso3_country"].isin(COUNTRIES)]
+
+    cube = build_emissions_cube(df)
+    sector = pd.Categorical(cube["sector"])
+
+    os.makedirs(os.path.join(snapshot_dir, "emissions"))
+    columns = {
+        "year": cube["year"].to_numpy(),
+        "sector": sector.codes,
+        "emissions": cube["emissions"].to_numpy(),
+    }
+    for name, values in columns.items():
+        np.save(
+            os.path.join(snapshot_dir, "emissions", f"{name}.npy"),
+            np.ascontiguousarray(values, dtype=EMISSIONS_DTYPES[name])
+        )
+
+    # The cube is sorted by country, so partition bounds are running sizes
+    sizes = cube.groupby("iso3_country", sort=False).size()
+    stops = sizes.cumsum()
+    partitions = {
+        str(country): [int(stop - size), int(stop)]
+        for country, size, stop in zip(sizes.index, sizes, stops)
+    }
+
+    return {
+        "first_year": int(df["year"].min()),
+        "latest_year": int(df["year"].max()),
+        "sectors": [str(s) for s in sector.categories],
+        "partitions": partitions,
+    }
+
+
+def content_ids(*columns):
+    """Short hashes identifying rows by the values of some columns."""
+    keys = columns[0].astype(str)
+    for column in columns[1:]:
+        keys = keys + "\x1f" + column.astype(str)
+    return keys.map(lambda key: hashlib.sha1(key.encode()).hexdigest()[:10])
+
+
+def _row_ids(table, id_column):
+    """Stable "<ISO3>-<source id>" ids for the rows of a policy table.
+
+    Without an id column the source id is a hash of the iso3 and title.
+    merged.csv repeats a fiscal record's id when it matched several IEA
+    policies (and the IEA lists some titles twice), so repeats get a ".1",
+    ".2", ... suffix in file order.
+    """
+    if id_column is None:
+        source_ids = content_ids(table["iso3"], table["title"])
+    else:
+        source_ids = table[id_column].astype(str)
+    source_ids = table["iso3"] + "-" + source_ids
+    repeat = source_ids.groupby(source_ids).cumcount()
+    return source_ids.where(repeat == 0, source_ids + "." + repeat.astype(str))
+
+
+def _table_payload(rows, columns, tooltip):
+    """The DataTable data, tooltip_data and sort index of some rows."""
+    rows = rows.reset_index(drop=True)
+    return {
+        "data": rows[["id"] + columns].to_dict("records"),
+        "tooltip_data": [
+            {tooltip: {"value": value, "type": "markdown"}}
+            for value in rows[tooltip].tolist()
+        ],
+        "sort_index": {column: build_sort_index(rows[column]) for column in columns},
+    }
+
+
+def _write_table(snapshot_dir, name, previous=None):
+    """Write one policy table per country; return each country's row digest.
+
+    Countries whose rows match ``previous`` (the snapshot directory and
+    manifest being replaced) are linked from it rather than re-rendered.
+    """
+    columns, tooltip = TABLES[name]["columns"], TABLES[name]["tooltip"]
+    table = pd.read_csv(SOURCES[name])
+    table = table[table["iso3"].notna()]
+    table["id"] = _row_ids(table, TABLES[name]["id"])
+    table = table.astype(object).where(table.notna(), None)
+
+    previous_dir, previous_digests = (
+        (previous[0], previous[1]["tables"][name]) if previous else (None, {})
+    )
+
+    os.makedirs(os.path.join(snapshot_dir, name, "descriptions"))
+    digests = {}
+    for iso3, rows in table.groupby("iso3", sort=False):
+        digest = hashlib.sha1(rows.to_json(orient="split", index=False).encode()).hexdigest()
+        digests[iso3] = digest
+        files = [os.path.join(name, f"{iso3}.json"), os.path.join(name, "descriptions", f"{iso3}.json")]
+
+        if previous_digests.get(iso3) == digest:
+            for path in files:
+                _reuse(previous_dir, snapshot_dir, path)
+            continue
+
+        with open(os.path.join(snapshot_dir, files[0]), "w") as f:
+            json.dump(_table_payload(rows, columns, tooltip), f)
+        with open(os.path.join(snapshot_dir, files[1]), "w") as f:
+            json.dump(dict(zip(rows["id"], map(render_description, rows["description"]))), f)
+
+    return dict(sorted(digests.items()))
+
+
+def _previous_snapshot(store_dir):
+    """(directory, manifest) of the current snapshot if its parts can be reused."""
+    version = current_version(store_dir)
+    if version is None:
+        return None
+    try:
+        manifest = _read_manifest(store_dir, version)
+    except FileNotFoundError:
+        return None
+    if manifest.get("format") != STORE_FORMAT:
+        return None
+    return os.path.join(store_dir, version), manifest
+
+
+@contextlib.contextmanager
+def _build_lock(store_dir):
+    """Hold the store's exclusive build lock, waiting for it if taken.
+
+    Builds from every process (gunicorn workers noticing the same data
+    drop, a deploy-time ``python datastore.py``) then run one at a time.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, ".build.lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def build_store(store_dir=STORE_DIR):
+    """Convert the source CSVs into a new snapshot and make it current.
+
+    Only the sources (and, for policy tables, the countries) that changed
+    since the current snapshot are rebuilt.
+    """
+    with _build_lock(store_dir):
+        return _build_store(store_dir)
+
+
+def _build_store(store_dir):
+    stats = _source_stats()
+    digests = {name: _file_digest(path) for name, path in SOURCES.items()}
+
+    version = hashlib.sha1(
+        "".join([str(STORE_FORMAT)] + [digests[name] for name in sorted(SOURCES)]).encode()
+    ).hexdigest()[:16]
+
+    os.makedirs(store_dir, exist_ok=True)
+    snapshot_dir = os.path.join(store_dir, version)
+    if not os.path.exists(os.path.join(snapshot_dir, "manifest.json")):
+        previous = _previous_snapshot(store_dir)
+        unchanged = {
+            name for name in SOURCES
+            if previous and previous[1]["digests"][name] == digests[name]
+        }
+
+        # Build next to the final location and rename into place, so a
+        # concurrent reader never sees a half-written snapshot
+        tmp_dir = tempfile.mkdtemp(prefix=f".{version}-", dir=store_dir)
+        os.chmod(tmp_dir, 0o755)
+        try:
+            manifest = {"version": version, "format": STORE_FORMAT, "sources": stats, "digests": digests}
+
+            if "emissions" in unchanged:
+                _reuse(previous[0], tmp_dir, "emissions")
+                manifest["emissions"] = previous[1]["emissions"]
+            else:
+                manifest["emissions"] = _write_emissions(tmp_dir)
+
+            manifest["tables"] = {}
+            for name in TABLES:
+                if name in unchanged:
+                    _reuse(previous[0], tmp_dir, name)
+                    manifest["tables"][name] = previous[1]["tables"][name]
+                else:
+                    manifest["tables"][name] = _write_table(tmp_dir, name, previous)
+
+            with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+                json.dump(manifest, f)
+            os.replace(tmp_dir, snapshot_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+    else:
+        # Same content under new mtimes (e.g. a re-copied CSV): keep the
+        # snapshot, only record the new stats so it is no longer stale
+        manifest = _read_manifest(store_dir, version)
+        manifest["sources"] = stats
+        _write_atomic(os.path.join(store_dir, version, "manifest.json"), json.dumps(manifest))
+
+    _set_current(store_dir, version)
+    prune_snapshots(store_dir)
+    return version
+
+
+def snapshot_versions(store_dir=STORE_DIR):
+    """Versions of the snapshots built in ``store_dir``, most recent first."""
+    built = []
+    for entry in os.scandir(store_dir):
+        manifest_path = os.path.join(entry.path, "manifest.json")
+        if entry.is_dir() and not entry.name.startswith(".") and os.path.exists(manifest_path):
+            built.append((os.stat(manifest_path).st_mtime, entry.name))
+    return [version for _, version in sorted(built, reverse=True)]
+
+
+def prune_snapshots(store_dir=STORE_DIR, keep=KEEP_SNAPSHOTS):
+    """Delete all but the ``keep`` most recently built snapshots (never the current one)."""
+    current = current_version(store_dir)
+    for version in snapshot_versions(store_dir)[keep:]:
+        if version != current:
+            shutil.rmtree(os.path.join(store_dir, version), ignore_errors=True)
+
+
+def _write_atomic(path, text):
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
+    os.chmod(tmp_path, 0o644)
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _set_current(store_dir, version):
+    _write_atomic(os.path.join(store_dir, "CURRENT"), version)
+
+
+# ------------------------------------------------------------
+# LOAD
+# ------------------------------------------------------------
+
+def current_version(store_dir=STORE_DIR):
+    try:
+        with open(os.path.join(store_dir, "CURRENT")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _read_manifest(store_dir, version):
+    with open(os.path.join(store_dir, version, "manifest.json")) as f:
+        return json.load(f)
+
+
+def _is_stale(manifest):
+    """True when the layout is outdated or a source CSV differs from the one built."""
+    if manifest.get("format") != STORE_FORMAT:
+        return True
+    for name, path in SOURCES.items():
+        if not os.path.exists(path):
+            continue
+        built = manifest["sources"][name]
+        stat = os.stat(path)
+        if stat.st_size != built["size"] or stat.st_mtime != built["mtime"]:
+            return True
+    return False
+
+
+def is_current(store, store_dir=STORE_DIR):
+    """True while ``store`` is the current snapshot and no source CSV has changed.
+
+    Cheap enough to poll: it reads CURRENT and one manifest and stats the CSVs.
+    """
+    version = current_version(store_dir)
+    return version == store["version"] and not _is_stale(_read_manifest(store_dir, version))
+
+
+def open_store(store_dir=STORE_DIR):
+    """Open the current snapshot, building it first if missing or stale.
+
+    Only one process builds at a time; the others wait for it and open the
+    snapshot it made current, unless that is already stale too.
+    """
+    version = current_version(store_dir)
+    if version is None or _is_stale(_read_manifest(store_dir, version)):
+        with _build_lock(store_dir):
+            version = current_version(store_dir)
+            if version is None or _is_stale(_read_manifest(store_dir, version)):
+                version = _build_store(store_dir)
+
+    snapshot_dir = os.path.join(store_dir, version)
+    manifest = _read_manifest(store_dir, version)
+
+    columns = {
+        name: np.load(
+            os.path.join(snapshot_dir, "emissions", f"{name}.npy"), mmap_mode="r"
+        )
+        for name in EMISSIONS_DTYPES
+    }
+
+    return {
+        "version": version,
+        "path": snapshot_dir,
+        "manifest": manifest,
+        "first_year": manifest["emissions"]["first_year"],
+        "latest_year": manifest["emissions"]["latest_year"],
+        "countries": sorted(manifest["emissions"]["partitions"]),
+        "table_countries": {name: set(isos) for name, isos in manifest["tables"].items()},
+        "sectors": np.array(manifest["emissions"]["sectors"], dtype=object),
+        "columns": columns,
+    }
+
+
+def country_cube(store, country):
+    """The (year, sector, emissions) cube rows of one country."""
+    start, stop = store["manifest"]["emissions"]["partitions"].get(country, (0, 0))
+    columns = store["columns"]
+    return pd.DataFrame({
+        "year": columns["year"][start:stop],
+        "sector": store["sectors"][columns["sector"][start:stop]],
+        "emissions": columns["emissions"][start:stop],
+    })
+
+
+def has_table_rows(store, name, country):
+    return country in store["table_countries"][name]
+
+
+def country_table(store, name, country):
+    """One country's payload of a policy table (no rows if it has none)."""
+    if not has_table_rows(store, name, country):
+        return {"data": [], "tooltip_data": [], "sort_index": {}}
+    with open(os.path.join(store["path"], name, f"{country}.json")) as f:
+        return json.load(f)
+
+
+PARTS = ["emissions"] + list(TABLES)
+
+
+def load_partition(store, country, part):
+    """Read one part of a country's partition: its emissions aggregates or a policy table."""
+    if part == "emissions":
+        return aggregate_country(country_cube(store, country))
+    return country_table(store, part, country)
+
+
+def single_flight(cached):
+    """Serialize concurrent calls of an LRU-cached function per key.
+
+    ``functools.lru_cache`` lets simultaneous misses on one key all compute
+    the value; with this wrapper the first computes it and the others wait
+    for it and hit the cache. Calls on other keys are not held up. A key's
+    lock is dropped once no call holds or waits on it.
+    """
+    # key -> [lock, number of calls holding or waiting on it]
+    locks = {}
+    guard = threading.Lock()
+
+    @functools.wraps(cached)
+    def call(*key):
+        with guard:
+            entry = locks.get(key)
+            if entry is None:
+                entry = locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                return cached(*key)
+        finally:
+            with guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del locks[key]
+
+    call.cache_info = cached.cache_info
+    call.cache_clear = cached.cache_clear
+    call.locks = locks
+    return call
+
+
+def partition_loader(store, maxsize=PARTITION_CACHE_SIZE):
+    """Return ``load(country, part)``, memoizing ``load_partition`` in an LRU.
+
+    The returned function exposes ``cache_info()`` (hits, misses, size)
+    and ``cache_clear()`` from ``functools.lru_cache``.
+    """
+    @functools.lru_cache(maxsize=maxsize * len(PARTS))
+    def load(country, part):
+        return load_partition(store, country, part)
+
+    return single_flight(load)
+
+
+def description_loader(store, maxsize=DESCRIPTION_CACHE_SIZE):
+    """Return ``load(name, row_id)`` giving one rendered description.
+
+    The id names the country, whose id -> description index is read on
+    first use and kept in an LRU (``load.cache_info()``). Unknown tables,
+    countries or ids give None.
+    """
+    @functools.lru_cache(maxsize=maxsize)
+    def read_descriptions(name, country):
+        with open(os.path.join(store["path"], name, "descriptions", f"{country}.json")) as f:
+            return json.load(f)
+
+    country_descriptions = single_flight(read_descriptions)
+
+    def load(name, row_id):
+        country = str(row_id).split("-", 1)[0]
+        if name not in TABLES or not has_table_rows(store, name, country):
+            return None
+        return country_descriptions(name, country).get(row_id)
+
+    load.cache_info = country_descriptions.cache_info
+    load.cache_clear = country_descriptions.cache_clear
+    return load
+
+
+if __name__ == "__main__":
+    print(f"Built data store version {build_store()} in {STORE_DIR}/")
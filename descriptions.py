@@ -0,0 +1,139 @@
+from html.parser import HTMLParser
+
+# ------------------------------------------------------------
+# PRE-RENDERED DESCRIPTIONS
+# ------------------------------------------------------------
+# Policy descriptions arrive as raw HTML. At build time each one is parsed
+# and sanitized once into a Dash component tree (the JSON the renderer
+# consumes), so the description panel can show the formatting without
+# dangerouslySetInnerHTML and without reparsing anything per click.
+#
+# Only the tags below survive, with headings scaled down to fit the panel.
+# Scripts, styles and similar elements are dropped along with their
+# content; any other tag is unwrapped, keeping its text. The only attribute
+# kept is an http(s)/mailto link target.
+
+NAMESPACE = "dash_html_components"
+
+ALLOWED_TAGS = {
+    "div": "Div", "p": "P", "span": "Span", "br": "Br",
+    "ul": "Ul", "ol": "Ol", "li": "Li",
+    "em": "Em", "i": "I", "strong": "Strong", "b": "B", "u": "U",
+    "blockquote": "Blockquote",
+    "h1": "H5", "h2": "H5", "h3": "H5", "h4": "H6", "h5": "H6", "h6": "H6",
+    "a": "A",
+}
+
+DROPPED_TAGS = {"script", "style", "iframe", "object", "embed", "template", "head", "title"}
+
+VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "wbr", "col", "area", "source"}
+
+SAFE_URL_SCHEMES = ("http://", "https://", "mailto:")
+
+
+def _component(type_, children, **props):
+    if children:
+        props["children"] = children[0] if len(children) == 1 and isinstance(children[0], str) else children
+    return {"type": type_, "namespace": NAMESPACE, "props": props}
+
+
+class _DescriptionParser(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        # Stack of (tag, props, children); the root collects the top level
+        self.stack = [(None, {}, [])]
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping:
+            return
+        if tag == "br":
+            self.stack[-1][2].append(_component("Br", []))
+            return
+        if tag in VOID_TAGS:
+            return
+
+        # An unclosed <li> or <p> ends where the next one starts
+        if tag in ("li", "p") and self._open_within(tag, ("ul", "ol") if tag == "li" else ("div",)):
+            self.handle_endtag(tag)
+
+        props = {}
+        if tag == "a":
+            href = (dict(attrs).get("href") or "").strip()
+            if href.lower().startswith(SAFE_URL_SCHEMES):
+                props = {"href": href, "target": "_blank", "rel": "noopener noreferrer"}
+        self.stack.append((tag, props, []))
+
+    def _open_within(self, tag, boundaries):
+        """True if ``tag`` is open more recently than any boundary tag."""
+        for open_tag, _, _ in reversed(self.stack[1:]):
+            if open_tag == tag:
+                return True
+            if open_tag in boundaries:
+                return False
+        return False
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in VOID_TAGS:
+            # <div/> and friends: an element with no content
+            self.handle_starttag(tag, attrs)
+            self.handle_endtag(tag)
+        else:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag in VOID_TAGS:
+            return
+        if not any(open_tag == tag for open_tag, _, _ in self.stack[1:]):
+            return
+        # Close everything up to the matching tag, as browsers do
+        while True:
+            open_tag, props, children = self.stack.pop()
+            self._emit(open_tag, props, children)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropping or not data:
+            return
+        siblings = self.stack[-1][2]
+        if siblings and isinstance(siblings[-1], str):
+            siblings[-1] += data
+        else:
+            siblings.append(data)
+
+    def _emit(self, tag, props, children):
+        parent = self.stack[-1][2]
+        if tag in ALLOWED_TAGS:
+            parent.append(_component(ALLOWED_TAGS[tag], children, **props))
+        else:
+            for child in children:
+                if isinstance(child, str):
+                    self.handle_data(child)
+                else:
+                    parent.append(child)
+
+    def result(self):
+        self.close()
+        while len(self.stack) > 1:
+            self._emit(*self.stack.pop())
+        return self.stack[0][2]
+
+
+def render_description(raw):
+    """Sanitize one raw HTML description into a Dash component tree.
+
+    Returns None for a missing or blank description.
+    """
+    if raw is None or not str(raw).strip():
+        return None
+    parser = _DescriptionParser()
+    parser.feed(str(raw))
+    return _component("Span", parser.result())
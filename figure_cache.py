@@ -0,0 +1,161 @@
+import functools
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+import plotly.io as pio
+
+from aggregates import select_view
+from datastore import STORE_DIR, single_flight, snapshot_versions
+from figures import build_figures
+from metrics import timed
+
+# ------------------------------------------------------------
+# FIGURE RESPONSE CACHE
+# ------------------------------------------------------------
+# With the default year range and sector selection, the three emissions
+# figures depend only on the country and the data, so they are cached under
+# (country, store version). Other views are cheap to build from the
+# cumulative aggregates and are not cached. Each process keeps the figure
+# dicts themselves in an LRU, so a hit is returned as is for Dash to
+# serialize once; an optional on-disk directory of their JSON is shared by
+# all gunicorn workers and can be warmed at deploy time with
+#
+#   python figure_cache.py [cache_dir]
+#
+# Entries live under <cache_dir>/<store version>.<figure format>/, so a
+# data rebuild or a change to the figures' encoding never serves stale
+# figures. Warming also prunes the directories of snapshots the store no
+# longer keeps and of older figure formats (``prune_cache``).
+
+# Bumped whenever the serialized figures change shape
+FIGURE_FORMAT = 3
+
+FIGURE_CACHE_SIZE = int(os.environ.get("DASHBOARD_FIGURE_CACHE_SIZE", "128"))
+
+# Shared on-disk backend; disabled unless a directory is configured
+FIGURE_CACHE_DIR = os.environ.get("DASHBOARD_FIGURE_CACHE_DIR")
+
+
+def serialize_figures(figures):
+    """One JSON array holding the figures, as stored in the disk cache."""
+    return "[" + ",".join(pio.to_json(fig, validate=False) for fig in figures) + "]"
+
+
+def _read_cached(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write_cached(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
+    os.chmod(tmp_path, 0o644)
+    with os.fdopen(fd, "w") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def _cache_key(store):
+    return f"{store['version']}.{FIGURE_FORMAT}"
+
+
+# Directory names written by _cache_key; nothing else in cache_dir is touched
+_CACHE_KEY_PATTERN = re.compile(r"[0-9a-f]+\.\d+")
+
+
+def figure_loader(store, load_partition, maxsize=FIGURE_CACHE_SIZE, cache_dir=FIGURE_CACHE_DIR):
+    """Return ``load(country, year_range=None, sectors=None)`` giving the three figures.
+
+    The figures of the default view (the store's full year span, top
+    sectors by their share in the latest year) are memoized in an LRU
+    (``load.cache_info()``) and, when ``cache_dir`` is set, read from or
+    written to the shared disk cache as JSON. Only countries in the store
+    are cached, which also keeps user input out of cache file names. The
+    cached figures are shared by every caller and must not be modified.
+
+    Over the store's full span, with or without a sector selection, the
+    sector bar shows the latest year's shares; a narrowed range shows the
+    shares of its summed emissions.
+    """
+    default_range = (store["first_year"], store["latest_year"])
+
+    def build_view(country, year_range, sectors):
+        # Over the full span the bar and ranking show the latest year; a
+        # narrowed range shows its sums
+        share_year = store["latest_year"] if year_range == default_range else None
+        with timed("partition"):
+            agg = load_partition(country, "emissions")
+        with timed("select_view"):
+            view = select_view(agg, year_range, sectors, share_year=share_year)
+        with timed("build_figures"):
+            return list(build_figures(country, view))
+
+    def build(country):
+        return build_view(country, default_range, None)
+
+    @single_flight
+    @functools.lru_cache(maxsize=maxsize)
+    def cached(country):
+        if cache_dir is None:
+            return build(country)
+
+        path = os.path.join(cache_dir, _cache_key(store), f"{country}.json")
+        payload = _read_cached(path)
+        if payload is not None:
+            with timed("decode_figures"):
+                return json.loads(payload)
+
+        figures = build(country)
+        with timed("serialize_figures"):
+            _write_cached(path, serialize_figures(figures))
+        return figures
+
+    known = set(store["countries"])
+
+    def load(country, year_range=None, sectors=None):
+        year_range = tuple(year_range) if year_range else default_range
+        if year_range != default_range or sectors:
+            return build_view(country, year_range, sectors)
+        return cached(country) if country in known else build(country)
+
+    load.cache_info = cached.cache_info
+    load.cache_clear = cached.cache_clear
+    load.cached = cached
+    return load
+
+
+def warm(load_figures, countries):
+    """Build and cache the figures of every country."""
+    for country in countries:
+        load_figures.cached(country)
+
+
+def prune_cache(cache_dir=FIGURE_CACHE_DIR, store_dir=STORE_DIR):
+    """Delete cached figures of snapshots no longer in ``store_dir`` or of another figure format."""
+    if cache_dir is None or not os.path.isdir(cache_dir):
+        return
+    kept = {f"{version}.{FIGURE_FORMAT}" for version in snapshot_versions(store_dir)}
+    for entry in os.scandir(cache_dir):
+        if entry.is_dir() and _CACHE_KEY_PATTERN.fullmatch(entry.name) and entry.name not in kept:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    from datastore import open_store, partition_loader
+
+    cache_dir = sys.argv[1] if len(sys.argv) > 1 else FIGURE_CACHE_DIR
+    if cache_dir is None:
+        sys.exit("usage: python figure_cache.py CACHE_DIR (or set DASHBOARD_FIGURE_CACHE_DIR)")
+
+    store = open_store()
+    load_figures = figure_loader(store, partition_loader(store), cache_dir=cache_dir)
+    warm(load_figures, store["countries"])
+    prune_cache(cache_dir)
+    print(f"Cached figures for {len(store['countries'])} countries in {cache_dir}/{_cache_key(store)}/")
@@ -0,0 +1,257 @@
+import base64
+
+import numpy as np
+import plotly.io as pio
+
+# ------------------------------------------------------------
+# DASHBOARD FIGURES
+# ------------------------------------------------------------
+# The three emissions charts, built from a view of a country's precomputed
+# aggregates for a year range and sector selection (aggregates.select_view).
+# The figures are emitted as plain dicts, trace for trace what Plotly
+# Express produced for them (same titles, hover templates, colors, category
+# order, tick formats and margins), without px's dataframe reshaping or
+# go.Figure validation.
+#
+# Two things keep the payloads compact. Numeric arrays are sent as float32
+# base64 typed arrays (7 significant digits, plenty for a chart). The
+# figures also leave out the Plotly template, which px would repeat in
+# every figure: the page holds it once and applies it in the browser (see
+# app.py).
+
+MARGIN = dict(l=20, r=20, t=40, b=20)
+TITLE_FONT_SIZE = 14
+
+# numpy dtypes plotly.js accepts as base64 typed arrays
+TYPED_ARRAY_DTYPES = {
+    "int8": "i1", "uint8": "u1", "int16": "i2", "uint16": "u2",
+    "int32": "i4", "uint32": "u4", "float32": "f4", "float64": "f8",
+}
+
+_template = None
+
+
+def figure_template():
+    """The active Plotly template as a dict, applied to the figures client-side."""
+    global _template
+    if _template is None:
+        _template = pio.templates[pio.templates.default].to_plotly_json()
+    return _template
+
+
+def _typed_array(values):
+    """Encode a numeric array the way plotly.py does (base64 typed array), floats as float32."""
+    if values.dtype == np.float64:
+        values = values.astype(np.float32)
+    dtype = TYPED_ARRAY_DTYPES.get(str(values.dtype))
+    if dtype is None or values.size == 0:
+        return values.tolist()
+    little_endian = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder("<"))
+    return {"dtype": dtype, "bdata": base64.b64encode(little_endian).decode("ascii")}
+
+
+def _layout(title, x_title, y_title, legend_title=None, **axes):
+    layout = {
+        "title": {"text": title, "font": {"size": TITLE_FONT_SIZE}},
+        "margin": MARGIN,
+        "legend": {"tracegroupgap": 0},
+        "xaxis": {"anchor": "y", "domain": [0.0, 1.0], "title": {"text": x_title}},
+        "yaxis": {"anchor": "x", "domain": [0.0, 1.0], "title": {"text": y_title}},
+    }
+    if legend_title is not None:
+        layout["legend"]["title"] = {"text": legend_title}
+    for axis, tickformat in axes.items():
+        layout[axis.replace("_tickformat", "axis")]["tickformat"] = tickformat
+    return layout
+
+
+def _years_label(view):
+    first, last = view["share_years"]
+    return str(last) if first == last else f"{first}–{last}"
+
+
+def _sectors_label(view):
+    return "Selected Sectors" if view["selected_sectors"] else "Top 5 Sectors"
+
+
+def sector_share_figure(country, view):
+    """Horizontal bar of each sector's share of national emissions."""
+    trace = {
+        "type": "bar",
+        "orientation": "h",
+        "x": _typed_array(view["shares"]),
+        "y": view["share_sectors"],
+        "name": "",
+        "legendgroup": "",
+        "showlegend": False,
+        "marker": {"color": figure_template()["layout"]["colorway"][0], "pattern": {"shape": ""}},
+        "textposition": "auto",
+        "hovertemplate": "Share of national emissions=%{x}<br>Sector=%{y}<extra></extra>",
+        "xaxis": "x",
+        "yaxis": "y",
+    }
+    layout = _layout(
+        f"{country}: Emissions by Sector ({_years_label(view)})",
+        "Share of national emissions", "Sector",
+        x_tickformat=".0%"
+    )
+    layout["barmode"] = "relative"
+    return {"data": [trace], "layout": layout}
+
+
+def _sector_trace(series, y_column, y_label):
+    sector = series["sector"]
+    return {
+        "type": "scatter",
+        "mode": "lines",
+        "orientation": "v",
+        "x": _typed_array(series["year"]),
+        "y": _typed_array(series[y_column]),
+        "name": sector,
+        "legendgroup": sector,
+        "showlegend": True,
+        "marker": {"symbol": "circle"},
+        "hovertemplate": f"Sector={sector}<br>Year=%{{x}}<br>{y_label}=%{{y}}<extra></extra>",
+        "xaxis": "x",
+        "yaxis": "y",
+    }
+
+
+def trends_figure(country, view):
+    """Absolute emissions of the top (or selected) sectors over time."""
+    colorway = figure_template()["layout"]["colorway"]
+    data = []
+    for i, series in enumerate(view["series"]):
+        trace = _sector_trace(series, "emissions", "Emissions")
+        trace["line"] = {"color": colorway[i % len(colorway)], "dash": "solid"}
+        data.append(trace)
+
+    layout = _layout(
+        f"{country}: Emissions Trends ({_sectors_label(view)})",
+        "Year", "Emissions",
+        legend_title="Sector" if data else None
+    )
+    return {"data": data, "layout": layout}
+
+
+def structure_figure(country, view):
+    """Stacked share of the top (or selected) sectors over time, by share."""
+    colorway = figure_template()["layout"]["colorway"]
+    rank = {sector: i for i, sector in enumerate(view["sector_order"])}
+    ordered = sorted(view["series"], key=lambda series: rank[series["sector"]])
+
+    data = []
+    for i, series in enumerate(ordered):
+        trace = _sector_trace(series, "share", "Share of emissions")
+        trace["line"] = {"color": colorway[i % len(colorway)]}
+        trace["fillpattern"] = {"shape": ""}
+        trace["stackgroup"] = "1"
+        trace["groupnorm"] = "fraction"
+        data.append(trace)
+
+    layout = _layout(
+        f"{country}: Emissions Structure Over Time ({_sectors_label(view)})",
+        "Year", "Share of emissions",
+        legend_title="Sector" if data else None,
+        y_tickformat=".0%"
+    )
+    return {"data": data, "layout": layout}
+
+
+def build_figures(country, view):
+    """Return the sector share bar, trends line and structure area figures."""
+    return (
+        sector_share_figure(country, view),
+        trends_figure(country, view),
+        structure_figure(country, view),
+    )
+
+
+# ------------------------------------------------------------
+# COMPARISON FIGURES
+# ------------------------------------------------------------
+# Built from comparison.compare(): one trace per country for the sector
+# and trend charts, one trace per sector for the structure chart.
+
+def comparison_sector_figure(comparison):
+    """Grouped bars of each country's emissions per sector in one year."""
+    colorway = figure_template()["layout"]["colorway"]
+    data = [
+        {
+            "type": "bar",
+            "orientation": "h",
+            "x": _typed_array(comparison["emissions"][i]),
+            "y": comparison["sectors"],
+            "name": country,
+            "legendgroup": country,
+            "marker": {"color": colorway[i % len(colorway)]},
+            "hovertemplate": f"Country={country}<br>Sector=%{{y}}<br>Emissions=%{{x}}<extra></extra>",
+        }
+        for i, country in enumerate(comparison["countries"])
+    ]
+    layout = _layout(
+        f"Emissions by Sector ({comparison['year']})",
+        "Emissions", "Sector",
+        legend_title="Country" if data else None
+    )
+    layout["barmode"] = "group"
+    layout["yaxis"]["autorange"] = "reversed"
+    return {"data": data, "layout": layout}
+
+
+def comparison_trends_figure(comparison):
+    """Total national emissions of each country over time."""
+    colorway = figure_template()["layout"]["colorway"]
+    data = [
+        {
+            "type": "scatter",
+            "mode": "lines",
+            "x": _typed_array(comparison["years"]),
+            "y": _typed_array(comparison["totals"][i]),
+            "name": country,
+            "legendgroup": country,
+            "line": {"color": colorway[i % len(colorway)]},
+            "hovertemplate": f"Country={country}<br>Year=%{{x}}<br>Emissions=%{{y}}<extra></extra>",
+        }
+        for i, country in enumerate(comparison["countries"])
+    ]
+    layout = _layout(
+        "Total Emissions Trends",
+        "Year", "Emissions",
+        legend_title="Country" if data else None
+    )
+    return {"data": data, "layout": layout}
+
+
+def comparison_structure_figure(comparison):
+    """Each country's sector mix in one year, as 100% stacked bars."""
+    colorway = figure_template()["layout"]["colorway"]
+    data = [
+        {
+            "type": "bar",
+            "x": comparison["countries"],
+            "y": _typed_array(comparison["shares"][:, j]),
+            "name": sector,
+            "legendgroup": sector,
+            "marker": {"color": colorway[j % len(colorway)]},
+            "hovertemplate": f"Sector={sector}<br>Country=%{{x}}<br>Share of emissions=%{{y}}<extra></extra>",
+        }
+        for j, sector in enumerate(comparison["sectors"])
+    ]
+    layout = _layout(
+        f"Emissions Structure ({comparison['year']})",
+        "Country", "Share of emissions",
+        legend_title="Sector" if data else None,
+        y_tickformat=".0%"
+    )
+    layout["barmode"] = "stack"
+    return {"data": data, "layout": layout}
+
+
+def build_comparison_figures(comparison):
+    """Return the sector, trends and structure comparison figures."""
+    return (
+        comparison_sector_figure(comparison),
+        comparison_trends_figure(comparison),
+        comparison_structure_figure(comparison),
+    )
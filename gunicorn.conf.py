@@ -0,0 +1,23 @@
+import multiprocessing
+import os
+
+# gunicorn -c gunicorn.conf.py
+#
+# Loads wsgi.py once in the master (see there) and forks the workers from
+# it, so they share the preloaded data. WEB_CONCURRENCY sets the number of
+# workers.
+#
+# The browser fires the callbacks of independent panels (tables, figures,
+# descriptions) as parallel requests, and each panel renders as soon as
+# its own response arrives. Spread over the workers, those requests run in
+# parallel; since the callbacks are mostly GIL-bound, more workers (cheap
+# with the shared preload) beat more threads. DASHBOARD_THREADS > 1 gives
+# each worker a thread pool (gunicorn's gthread worker), which helps when
+# requests wait on I/O such as a shared figure cache on a network disk.
+
+wsgi_app = "wsgi:server"
+preload_app = True
+
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+
+threads = int(os.environ.get("DASHBOARD_THREADS", "1"))
@@ -0,0 +1,206 @@
+import bisect
+import contextlib
+import cProfile
+import functools
+import os
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+
+# ------------------------------------------------------------
+# METRICS AND PROFILING
+# ------------------------------------------------------------
+# Hot-path timings, payload sizes and cache statistics, served in the
+# Prometheus text format at /metrics:
+#
+#   dashboard_request_seconds{callback}   whole _dash-update-component request
+#   dashboard_response_bytes{callback}    its body as sent (gzipped when
+#                                         the client accepts it)
+#   dashboard_callback_seconds{callback}  the callback function alone
+#   dashboard_stage_seconds{stage}        partition load, view selection,
+#                                         figure building, serialization, ...
+#   dashboard_cache_*{cache}              LRU hits, misses and sizes of the
+#                                         live snapshot, read at scrape time
+#
+# A callback is labelled by its first output id ("unknown" for outputs no
+# callback is registered for, or when it is called outside a request), the
+# same in all three callback histograms. Every process keeps its own numbers, so
+# under gunicorn each worker reports the requests it served.
+#
+# Setting DASHBOARD_PROFILE_DIR enables a per-request profiler: a request
+# sent with an "X-Profile: 1" header runs under cProfile and leaves a
+# .prof file in that directory (open it with snakeviz or pstats).
+
+PROFILE_DIR = os.environ.get("DASHBOARD_PROFILE_DIR")
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    "dashboard_request_seconds": ("Time to serve a callback request.", SECONDS_BUCKETS),
+    "dashboard_response_bytes": ("Size of a callback response body.", BYTES_BUCKETS),
+    "dashboard_callback_seconds": ("Time spent in a callback function.", SECONDS_BUCKETS),
+    "dashboard_stage_seconds": ("Time spent in one stage of a callback.", SECONDS_BUCKETS),
+}
+
+# Loaders of a snapshot whose cache_info() is reported, by cache label
+CACHES = {
+    "partition": "load_partition",
+    "description": "load_description",
+    "figure": "load_figures",
+}
+
+_lock = threading.Lock()
+
+# (name, labels) -> [count per bucket..., count in +Inf, sum]
+_observations = {}
+
+
+def observe(name, value, **labels):
+    """Record one value in a histogram."""
+    buckets = HISTOGRAMS[name][1]
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        counts = _observations.get(key)
+        if counts is None:
+            counts = _observations[key] = [0] * (len(buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(buckets, value)] += 1
+        counts[-1] += value
+
+
+@contextlib.contextmanager
+def timed(stage):
+    """Time the enclosed block as one stage in dashboard_stage_seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("dashboard_stage_seconds", time.perf_counter() - start, stage=stage)
+
+
+def timed_callback(func):
+    """Time a callback function in dashboard_callback_seconds.
+
+    It is labelled like the request that ran it, by the first output id.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            label = g.get("metrics_callback", "unknown") if has_request_context() else "unknown"
+            observe("dashboard_callback_seconds", time.perf_counter() - start, callback=label)
+
+    return wrapper
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _render_histograms():
+    with _lock:
+        snapshot = {key: list(counts) for key, counts in _observations.items()}
+
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (key_name, labels), counts in sorted(snapshot.items()):
+            if key_name != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+            cumulative += counts[len(buckets)]
+            lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {cumulative}')
+            lines.append(f"{name}_sum{_labels(labels)} {counts[-1]}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+    return lines
+
+
+def _render_caches(snapshot):
+    stats = {label: snapshot[loader].cache_info() for label, loader in CACHES.items()}
+    lines = []
+    for field, kind, help_text in (
+        ("hits", "counter", "Lookups answered from an LRU cache."),
+        ("misses", "counter", "Lookups that had to load or build the value."),
+        ("currsize", "gauge", "Entries held in an LRU cache."),
+        ("maxsize", "gauge", "Capacity of an LRU cache."),
+    ):
+        name = f"dashboard_cache_{field}" + ("_total" if kind == "counter" else "")
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for label, info in stats.items():
+            lines.append(f"{name}{_labels((), cache=label)} {getattr(info, field)}")
+
+    lines += [
+        "# HELP dashboard_store_info Data store snapshot being served.",
+        "# TYPE dashboard_store_info gauge",
+        f"dashboard_store_info{_labels((), version=snapshot['version'])} 1",
+    ]
+    return lines
+
+
+def render(snapshot):
+    """All metrics in the Prometheus text exposition format."""
+    return "\n".join(_render_histograms() + _render_caches(snapshot)) + "\n"
+
+
+def _callback_label(callback_map):
+    """First output id of a _dash-update-component request.
+
+    Only outputs of registered callbacks are used as labels, so requests
+    cannot create series of their own.
+    """
+    body = request.get_json(silent=True) or {}
+    output = body.get("output")
+    if not isinstance(output, str) or output not in callback_map:
+        return "unknown"
+    return output.strip(".").split(".")[0]
+
+
+def install(app, current_snapshot):
+    """Add request timing, the optional profiler and /metrics to the Dash app's server."""
+    server = app.server
+
+    @server.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        if request.path.endswith("/_dash-update-component"):
+            g.metrics_callback = _callback_label(app.callback_map)
+        if PROFILE_DIR and request.headers.get("X-Profile") == "1":
+            g.profiler = cProfile.Profile()
+            try:
+                g.profiler.enable()
+            except ValueError:
+                # Another request in this process is already being profiled
+                g.profiler = None
+
+    @server.after_request
+    def record_request(response):
+        profiler = g.pop("profiler", None)
+        is_callback = request.path.endswith("/_dash-update-component")
+        label = g.get("metrics_callback", "unknown") if is_callback else request.path.strip("/").replace("/", "_") or "index"
+
+        if is_callback and "metrics_start" in g:
+            observe("dashboard_request_seconds", time.perf_counter() - g.metrics_start, callback=label)
+            observe("dashboard_response_bytes", response.calculate_content_length() or 0, callback=label)
+
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"{time.time():.6f}-{os.getpid()}-{label}.prof"))
+        return response
+
+    @server.route("/metrics")
+    def metrics():
+        return Response(render(current_snapshot()), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,323 @@
+import argparse
+import logging
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from datastore import COUNTRY_INFO_CSV, FISCAL_CSV, content_ids
+
+# ------------------------------------------------------------
+# FISCAL MEASURE -> IEA POLICY MATCHING
+# ------------------------------------------------------------
+# Regenerates merged.csv: every fiscal measure of the government spending
+# tracker is matched to the IEA policy of the same country whose title is
+# most similar to its own, and takes that policy's title and description.
+#
+#   python policy_matching.py FISCAL_CSV [--iea updated_IEA.csv] [--out merged.csv]
+#
+# Titles are normalized (lowercase, letters, digits and single spaces; IEA
+# titles keep their accented letters, as in the original matching) and
+# compared with a token-set ratio on a 0-100 scale: two titles score 100
+# when the words of one are a subset of the other's. A measure is matched
+# when its best score reaches MATCH_THRESHOLD; otherwise the matched
+# columns stay empty, as does the score when its country has no IEA
+# policies at all. A measure matching a title the IEA lists several times
+# gets one row per listing, like the original join.
+#
+# Only titles of the same country are compared (blocking by iso3), and the
+# search within a country is exact but pruned. For each measure an upper
+# bound of its score against every title of the country is computed at
+# once with numpy, from the words they share (found through an inverted
+# word index) and their character counts. Titles are then scored in order
+# of that bound until it falls below the best score so far, and the full
+# comparison is skipped for pairs that cannot beat it. Countries are spread
+# over worker processes.
+
+logger = logging.getLogger(__name__)
+
+MATCH_THRESHOLD = 85
+
+FISCAL_COLUMNS = ["country", "policy", "measures", "start_year", "status", "budget_commitment"]
+
+OUTPUT_COLUMNS = [
+    "Unnamed: 0.1", "Unnamed: 0", *FISCAL_COLUMNS,
+    "title_norm", "matched_title", "match_score", "description", "iso3",
+]
+
+# Country names used by the spending tracker -> ISO3 codes of the IEA data
+COUNTRY_ISO3 = {
+    "Albania": "ALB", "Algeria": "DZA", "Angola": "AGO", "Argentina": "ARG",
+    "Australia": "AUS", "Austria": "AUT", "Azerbaijan": "AZE", "Bahrain": "BHR",
+    "Bangladesh": "BGD", "Barbados": "BRB", "Belgium": "BEL",
+    "Bosnia and Herzegovina": "BIH", "Brazil": "BRA", "Bulgaria": "BGR",
+    "Cambodia": "KHM", "Cameroon": "CMR", "Canada": "CAN", "Chile": "CHL",
+    "People's Republic of China": "CHN", "China": "CHN", "Chinese Taipei": "TWN",
+    "Colombia": "COL", "Costa Rica": "CRI", "Cote D'ivoire": "CIV",
+    "Côte d'Ivoire": "CIV", "Croatia": "HRV", "Cyprus": "CYP",
+    "Czech Republic": "CZE", "Czechia": "CZE", "Denmark": "DNK",
+    "Dominican Republic": "DOM", "Ecuador": "ECU", "Egypt": "EGY",
+    "El Salvador": "SLV", "Estonia": "EST", "Finland": "FIN", "France": "FRA",
+    "Germany": "DEU", "Ghana": "GHA", "Greece": "GRC", "Guatemala": "GTM",
+    "Honduras": "HND", "Hong Kong (China)": "HKG", "Hong Kong": "HKG",
+    "Hungary": "HUN", "Iceland": "ISL", "India": "IND", "Indonesia": "IDN",
+    "Ireland": "IRL", "Israel": "ISR", "Italy": "ITA", "Jamaica": "JAM",
+    "Japan": "JPN", "Jordan": "JOR", "Kazakhstan": "KAZ", "Kenya": "KEN",
+    "Korea": "KOR", "Kuwait": "KWT", "Latvia": "LVA", "Lithuania": "LTU",
+    "Luxembourg": "LUX", "Malaysia": "MYS", "Malta": "MLT", "Mexico": "MEX",
+    "Morocco": "MAR", "Netherlands": "NLD", "New Zealand": "NZL",
+    "Nicaragua": "NIC", "Nigeria": "NGA", "Norway": "NOR", "Oman": "OMN",
+    "Pakistan": "PAK", "Panama": "PAN", "Paraguay": "PRY", "Peru": "PER",
+    "Philippines": "PHL", "Poland": "POL", "Portugal": "PRT", "Qatar": "QAT",
+    "Romania": "ROU", "Russia": "RUS", "Russian Federation": "RUS",
+    "Saint Lucia": "LCA", "Saudi Arabia": "SAU", "Serbia": "SRB",
+    "Singapore": "SGP", "Slovak Republic": "SVK", "Slovakia": "SVK",
+    "Slovenia": "SVN", "South Africa": "ZAF", "Spain": "ESP", "Sri Lanka": "LKA",
+    "Sweden": "SWE", "Switzerland": "CHE", "Thailand": "THA", "Tunisia": "TUN",
+    "Turkiye": "TUR", "Türkiye": "TUR", "Turkey": "TUR", "Uganda": "UGA",
+    "Ukraine": "UKR", "United Arab Emirates": "ARE", "United Kingdom": "GBR",
+    "United Republic of Tanzania": "TZA", "United States": "USA",
+    "Uruguay": "URY", "Viet Nam": "VNM", "Vietnam": "VNM",
+}
+
+NON_ALNUM = re.compile(r"[^a-z0-9\s]")
+NON_WORD = re.compile(r"[^\w\s]|_")
+WHITESPACE = re.compile(r"\s+")
+
+# Characters of a normalized title, for the character-count bounds; any
+# other (accented) character is counted in one extra column
+ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789 "
+
+
+def normalize_title(title):
+    """Lowercase, drop everything but letters, digits and spaces, collapse spaces."""
+    if not isinstance(title, str):
+        return ""
+    return WHITESPACE.sub(" ", NON_ALNUM.sub("", title.lower())).strip()
+
+
+def normalize_policy_title(title):
+    """Like normalize_title, but keeping letters outside a-z (IEA titles)."""
+    if not isinstance(title, str):
+        return ""
+    return WHITESPACE.sub(" ", NON_WORD.sub("", title.lower())).strip()
+
+
+def _lcs_length(a, b):
+    """Length of the longest common subsequence (bit-parallel, one pass over b)."""
+    if not a or not b:
+        return 0
+    masks = {}
+    for i, char in enumerate(a):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    full = (1 << len(a)) - 1
+    v = full
+    for char in b:
+        u = v & masks.get(char, 0)
+        v = ((v + u) | (v - u)) & full
+    return len(a) - v.bit_count()
+
+
+def _ratio(distance, length):
+    return 100.0 if length == 0 else 100.0 * (1 - distance / length)
+
+
+def token_set_ratio(a_tokens, b_tokens, score_cutoff=0.0):
+    """Similarity (0-100) of two titles given as sets of words.
+
+    The best of three comparisons built from the shared words and the
+    words only one side has; 100 when one set contains the other. Scores
+    below ``score_cutoff`` are returned as 0, mostly without computing the
+    costly comparison of the unshared words.
+    """
+    if not a_tokens or not b_tokens:
+        return 0.0
+    shared = a_tokens & b_tokens
+    only_a, only_b = a_tokens - b_tokens, b_tokens - a_tokens
+    if shared and (not only_a or not only_b):
+        return 100.0
+
+    sect = " ".join(sorted(shared))
+    diff_a, diff_b = " ".join(sorted(only_a)), " ".join(sorted(only_b))
+    sep = 1 if sect else 0
+    sect_a_len = len(sect) + sep + len(diff_a)
+    sect_b_len = len(sect) + sep + len(diff_b)
+
+    best = 0.0
+    if sect:
+        best = max(
+            _ratio(sep + len(diff_a), len(sect) + sect_a_len),
+            _ratio(sep + len(diff_b), len(sect) + sect_b_len),
+        )
+
+    # The unshared words can have at most as many characters in common as
+    # the shorter side, or as their character counts allow
+    lensum = sect_a_len + sect_b_len
+    if _ratio(abs(len(diff_a) - len(diff_b)), lensum) > best:
+        common = sum((Counter(diff_a) & Counter(diff_b)).values())
+        bound = _ratio(len(diff_a) + len(diff_b) - 2 * common, lensum)
+        if bound > best and bound >= score_cutoff:
+            indel = len(diff_a) + len(diff_b) - 2 * _lcs_length(diff_a, diff_b)
+            best = max(best, _ratio(indel, lensum))
+    return best if best >= score_cutoff else 0.0
+
+
+def _char_counts(strings):
+    other = len(ALPHABET)
+    counts = np.zeros((len(strings), other + 1), dtype=np.int32)
+    column = {char: k for k, char in enumerate(ALPHABET)}
+    for row, string in enumerate(strings):
+        for char in string:
+            counts[row, column.get(char, other)] += 1
+    return counts
+
+
+def match_block(queries, titles):
+    """Best title index and score for each normalized query of one country.
+
+    Exact: the result is that of scoring every pair, ties going to the
+    first title.
+    """
+    title_tokens = [set(t.split()) for t in titles]
+    title_joined = [" ".join(sorted(tokens)) for tokens in title_tokens]
+    title_counts = _char_counts(title_joined)
+    title_lengths = np.array([len(t) for t in title_joined])
+
+    index = {}
+    for k, tokens in enumerate(title_tokens):
+        for token in tokens:
+            index.setdefault(token, []).append(k)
+    token_counts = {token: _char_counts([token])[0] for token in index}
+    order_ties = np.arange(len(titles))
+
+    best_index = np.full(len(queries), -1)
+    best_score = np.full(len(queries), np.nan)
+    if not titles:
+        return best_index, best_score
+
+    for row, query in enumerate(queries):
+        tokens = set(query.split())
+        joined = " ".join(sorted(tokens))
+        if not tokens:
+            best_index[row], best_score[row] = 0, 0.0
+            continue
+
+        # Characters and word count each title shares with the query
+        shared = [token for token in tokens if token in index]
+        in_title = np.zeros((len(titles), len(shared)))
+        for j, token in enumerate(shared):
+            in_title[index[token], j] = 1
+        n_shared = in_title.sum(axis=1)
+        sep = (n_shared > 0).astype(int)
+        sect_len = in_title @ np.array([len(token) for token in shared], dtype=float) + n_shared - sep
+        sect_counts = in_title @ np.array([token_counts[token] for token in shared]).reshape(len(shared), len(ALPHABET) + 1)
+
+        # Upper bound of each pair's score: the two comparisons against the
+        # shared words are exact, the one between the unshared words is at
+        # most what their character counts allow
+        only_q = len(joined) - sect_len - sep
+        only_t = title_lengths - sect_len - sep
+        common = np.minimum(_char_counts([joined])[0] - sect_counts, title_counts - sect_counts).sum(axis=1)
+        lensum = len(joined) + title_lengths
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bound = np.maximum.reduce([
+                100.0 * (1 - (only_q + only_t - 2 * common) / lensum),
+                np.where(sep, 100.0 * (1 - (sep + only_q) / (sect_len + len(joined))), 0.0),
+                np.where(sep, 100.0 * (1 - (sep + only_t) / (sect_len + title_lengths)), 0.0),
+                np.where(sep & ((only_q == 0) | (only_t == 0)), 100.0, 0.0),
+            ]) + 1e-9
+
+        best_k, best = -1, -1.0
+        for k in np.lexsort((order_ties, -bound)):
+            if bound[k] < best:
+                break
+            score = token_set_ratio(tokens, title_tokens[k], max(best, 0.0))
+            if score > best or (score == best and k < best_k):
+                best_k, best = int(k), score
+
+        best_index[row], best_score[row] = best_k, best
+    return best_index, best_score
+
+
+def _match_country(args):
+    iso3, positions, queries, titles = args
+    best_index, best_score = match_block(queries, titles)
+    return iso3, positions, best_index, best_score
+
+
+def match_policies(fiscal, iea, threshold=MATCH_THRESHOLD, workers=None):
+    """The merged table: fiscal measures with their matched IEA policy."""
+    fiscal = fiscal.reset_index(drop=True)
+    if "Unnamed: 0" in fiscal:
+        source_ids = fiscal["Unnamed: 0"]
+    else:
+        # A hash of the measure, so ids do not shift when rows are added
+        source_ids = content_ids(fiscal["country"], fiscal["policy"])
+        repeat = source_ids.groupby(source_ids).cumcount()
+        source_ids = source_ids.where(repeat == 0, source_ids + "." + repeat.astype(str))
+    iso3 = fiscal["iso3"] if "iso3" in fiscal else fiscal["country"].map(COUNTRY_ISO3)
+
+    unknown = sorted(fiscal.loc[iso3.isna(), "country"].dropna().unique())
+    if unknown:
+        logger.warning("No ISO3 code for: %s", ", ".join(unknown))
+
+    title_norm = fiscal["policy"].map(normalize_title)
+    iea = iea[iea["iso3"].notna()].reset_index(drop=True)
+    iea_titles = iea["title"].astype(str)
+    iea_norm = iea_titles.map(normalize_policy_title)
+
+    no_rows = np.array([], dtype=np.intp)
+    blocks = []
+    iea_rows = iea.groupby("iso3").indices
+    for code, positions in fiscal.groupby(iso3).indices.items():
+        rows = iea_rows.get(code, no_rows)
+        blocks.append((code, positions, title_norm[positions].tolist(), iea_norm[rows].tolist()))
+
+    matched_title = pd.Series(None, index=fiscal.index, dtype=object)
+    match_score = pd.Series(np.nan, index=fiscal.index)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_match_country, blocks, chunksize=max(1, len(blocks) // (4 * workers))))
+    else:
+        results = [_match_country(block) for block in blocks]
+
+    for code, positions, best_index, best_score in results:
+        rows = iea_rows.get(code, no_rows)
+        match_score[positions] = best_score
+        matched = best_score >= threshold
+        matched_title[positions[matched]] = iea_titles[rows[best_index[matched]]].to_numpy()
+
+    merged = fiscal[FISCAL_COLUMNS].assign(
+        **{"Unnamed: 0.1": source_ids.to_numpy(), "Unnamed: 0": source_ids.to_numpy()},
+        title_norm=title_norm,
+        matched_title=matched_title,
+        match_score=match_score,
+        _iso3=iso3,
+    )
+
+    # One row per IEA listing of the matched title (a left join on it)
+    policies = iea.rename(columns={"title": "matched_title"})[["iso3", "matched_title", "description"]]
+    policies = policies[policies["matched_title"].notna()]
+    merged = merged.merge(
+        policies, how="left", left_on=["_iso3", "matched_title"], right_on=["iso3", "matched_title"]
+    )
+    return merged[OUTPUT_COLUMNS]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Match fiscal measures to IEA policies and write merged.csv.")
+    parser.add_argument("fiscal_csv", help="spending tracker export (country, policy, measures, ...)")
+    parser.add_argument("--iea", default=COUNTRY_INFO_CSV, help="IEA policies with iso3, title and description")
+    parser.add_argument("--out", default=FISCAL_CSV)
+    parser.add_argument("--threshold", type=float, default=MATCH_THRESHOLD)
+    parser.add_argument("--workers", type=int, help="processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    merged = match_policies(pd.read_csv(args.fiscal_csv), pd.read_csv(args.iea), args.threshold, args.workers)
+    merged.to_csv(args.out, index=False)
+    print(f"Matched {merged['matched_title'].notna().sum()} of {len(merged)} rows into {args.out}")
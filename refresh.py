@@ -0,0 +1,107 @@
+import logging
+import os
+import threading
+
+from comparison import comparison_engine
+from datastore import STORE_DIR, description_loader, is_current, open_store, partition_loader
+from figure_cache import figure_loader, prune_cache, warm
+
+# ------------------------------------------------------------
+# LIVE SNAPSHOT AND BACKGROUND REFRESH
+# ------------------------------------------------------------
+# Everything the callbacks read is bundled per store snapshot: the store
+# itself and the loaders (and their caches) built on it. A background
+# thread polls the source CSVs; when they change it builds the new snapshot
+# (incrementally, see datastore.py), warms its caches and then swaps
+# it in by replacing a single reference. A callback takes the snapshot once
+# when it starts, so requests in flight finish on the old one and the first
+# requests after a data drop do not all land on cold caches.
+#
+# When several workers poll the same store, the first to notice a change
+# builds it under the store's build lock; the others wait for the lock and
+# then open the snapshot it left in CURRENT instead of building their own.
+# The thread belongs to one process: ``start()`` is safe to call on every
+# request and starts it once per process, including in workers forked from
+# a preloaded master.
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the source CSVs; 0 disables the background refresh
+REFRESH_INTERVAL = float(os.environ.get("DASHBOARD_REFRESH_INTERVAL", "30"))
+
+
+def open_snapshot(store):
+    """The store and the cached loaders the callbacks use on it."""
+    load_partition = partition_loader(store)
+    return {
+        "store": store,
+        "version": store["version"],
+        "load_partition": load_partition,
+        "load_description": description_loader(store),
+        "load_figures": figure_loader(store, load_partition),
+        "compare_countries": comparison_engine(store),
+    }
+
+
+def warm_snapshot(snapshot, store_dir=STORE_DIR):
+    """Build the figures of every country and the comparison cube up front.
+
+    Cached figures of snapshots pruned from ``store_dir`` are removed too.
+    """
+    warm(snapshot["load_figures"], snapshot["store"]["countries"])
+    snapshot["compare_countries"]([])
+    prune_cache(store_dir=store_dir)
+
+
+def snapshot_loader(store_dir=STORE_DIR, interval=REFRESH_INTERVAL):
+    """Return ``current()`` giving the live snapshot.
+
+    ``current.refresh()`` checks the sources once and swaps in a new
+    snapshot if they changed (True when it did); ``current.start()`` runs
+    that check every ``interval`` seconds in a daemon thread of the
+    calling process.
+    """
+    live = {"snapshot": open_snapshot(open_store(store_dir))}
+    lock = threading.Lock()
+    stopped = threading.Event()
+    watcher = {"pid": None, "lock": threading.Lock()}
+
+    def current():
+        return live["snapshot"]
+
+    def refresh():
+        with lock:
+            old = live["snapshot"]
+            if is_current(old["store"], store_dir):
+                return False
+
+            store = open_store(store_dir)
+            if store["version"] == old["version"]:
+                return False
+
+            snapshot = open_snapshot(store)
+            warm_snapshot(snapshot, store_dir)
+            live["snapshot"] = snapshot
+            logger.info("Data store refreshed: %s -> %s", old["version"], store["version"])
+            return True
+
+    def watch():
+        while not stopped.wait(interval):
+            try:
+                refresh()
+            except Exception:
+                # Keep serving the current snapshot and retry on the next tick
+                logger.exception("Data store refresh failed")
+
+    def start():
+        if interval <= 0 or watcher["pid"] == os.getpid():
+            return
+        with watcher["lock"]:
+            if watcher["pid"] != os.getpid():
+                watcher["pid"] = os.getpid()
+                threading.Thread(target=watch, name="data-refresh", daemon=True).start()
+
+    current.refresh = refresh
+    current.start = start
+    current.stop = stopped.set
+    return current
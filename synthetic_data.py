@@ -0,0 +1,132 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from datastore import COUNTRIES, COUNTRY_INFO_CSV, EMISSIONS_CSV, FISCAL_CSV
+
+# ------------------------------------------------------------
+# SYNTHETIC INPUT FILES
+# ------------------------------------------------------------
+# Scaled-up stand-ins for the three source CSVs, with the columns and value
+# shapes the dashboard reads (budgets stored as text such as "< 1", fiscal
+# ids repeated by the title matching, HTML descriptions, rows for countries
+# outside COUNTRIES). Used by benchmark.py; the output is fully determined
+# by the scale and the seed.
+#
+#   python synthetic_data.py OUT_DIR [--scale N] [--seed S]
+#
+# At scale 1 the emissions inventory has about 150k rows and each country
+# about 20 IEA policies and 15 fiscal measures; everything grows linearly.
+
+SECTORS = [
+    "agriculture", "buildings", "fluorinated-gases", "forestry-and-land-use",
+    "fossil-fuel-operations", "manufacturing", "mineral-extraction", "power",
+    "transportation", "waste",
+]
+
+YEARS = range(2000, 2024)
+
+STATUSES = ["In force", "Planned", "Ended", "Announced"]
+
+# Inventory rows of countries the dashboard filters out
+EXTRA_COUNTRIES = ["ABW", "ZWE", "XKX"]
+
+
+def _descriptions(rng, n, paragraphs=3):
+    words = np.array(["energy", "tax", "credit", "grid", "vehicle", "efficiency", "support", "households", "industry", "emissions"])
+    texts = []
+    for size in rng.integers(1, paragraphs + 1, n):
+        body = "<br><br>".join(
+            " ".join(rng.choice(words, rng.integers(20, 60))).capitalize() + "."
+            for _ in range(size)
+        )
+        texts.append(f"<div><p>{body}</p><ul><li>Measure <em>one</em></li><li>Measure two</li></ul></div>")
+    return texts
+
+
+def emissions_inventory(rng, scale):
+    """Rows per (country, year, sector, subsector), several subsectors per sector."""
+    countries = COUNTRIES + EXTRA_COUNTRIES
+    subsectors = 8 * scale
+    index = pd.MultiIndex.from_product(
+        [countries, YEARS, SECTORS, range(subsectors)],
+        names=["iso3_country", "year", "sector", "subsector"]
+    ).to_frame(index=False)
+    index["subsector"] = index["sector"] + "-" + index["subsector"].astype(str)
+
+    # Country size times a sector profile times a slow yearly drift
+    size = dict(zip(countries, rng.lognormal(10, 1.5, len(countries))))
+    profile = dict(zip(SECTORS, rng.dirichlet(np.ones(len(SECTORS)))))
+    drift = 1 + 0.02 * (index["year"] - YEARS[0]) * rng.normal(0, 1, len(index))
+    index["emissions"] = (
+        index["iso3_country"].map(size) * index["sector"].map(profile)
+        * np.clip(drift, 0.1, None) * rng.lognormal(0, 0.5, len(index)) / subsectors
+    )
+
+    # Not every country reports every subsector every year
+    return index[rng.random(len(index)) > 0.1]
+
+
+def iea_policies(rng, scale):
+    per_country = 20 * scale
+    iso3 = np.repeat(COUNTRIES, per_country)
+    return pd.DataFrame({
+        "iso3": iso3,
+        "title": [f"{c} policy {i} on {rng.choice(SECTORS)}" for c, i in zip(iso3, np.tile(range(per_country), len(COUNTRIES)))],
+        "status": rng.choice(STATUSES, len(iso3)),
+        "description": _descriptions(rng, len(iso3)),
+    })
+
+
+def fiscal_measures(rng, scale):
+    per_country = 15 * scale
+    iso3 = np.repeat(COUNTRIES, per_country)
+    n = len(iso3)
+
+    # Some fiscal records matched several policies and repeat their id
+    record = np.arange(n)
+    repeats = rng.random(n) < 0.02
+    record[1:][repeats[1:]] = record[:-1][repeats[1:]]
+
+    budget = rng.lognormal(5, 2, n).round().astype(int).astype(str).astype(object)
+    budget[rng.random(n) < 0.1] = "< 1"
+    budget[rng.random(n) < 0.05] = None
+
+    titles = [f"{c} fiscal measure {i}" for c, i in zip(iso3, record)]
+    return pd.DataFrame({
+        "Unnamed: 0.1": np.arange(n),
+        "Unnamed: 0": record,
+        "country": iso3,
+        "policy": titles,
+        "measures": rng.choice(["Low-carbon vehicles", "Energy affordability", "Grid investment"], n),
+        "start_year": rng.integers(2015, 2024, n),
+        "status": rng.choice(STATUSES, n),
+        "budget_commitment": budget,
+        "title_norm": [t.lower() for t in titles],
+        "matched_title": titles,
+        "match_score": rng.uniform(85, 100, n).round(1),
+        "description": _descriptions(rng, n),
+        "iso3": iso3,
+    })
+
+
+def write_synthetic(out_dir, scale=1, seed=0):
+    """Write the three source CSVs into ``out_dir``."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    emissions_inventory(rng, scale).to_csv(os.path.join(out_dir, EMISSIONS_CSV), index=False)
+    iea_policies(rng, scale).to_csv(os.path.join(out_dir, COUNTRY_INFO_CSV), index=False)
+    fiscal_measures(rng, scale).to_csv(os.path.join(out_dir, FISCAL_CSV), index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write scaled-up synthetic input CSVs.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_synthetic(args.out_dir, args.scale, args.seed)
+    print(f"Wrote synthetic inputs at scale {args.scale} to {args.out_dir}/")
@@ -0,0 +1,162 @@
+import math
+import re
+
+import pandas as pd
+
+# ------------------------------------------------------------
+# SERVER-SIDE TABLE QUERIES
+# ------------------------------------------------------------
+# The policy DataTables use page_action/sort_action/filter_action="custom":
+# the browser only sends its paging, sort and filter state and receives the
+# visible page. Queries run against a country's table payload from the data
+# store, whose per-column sort index avoids sorting on every request.
+
+# Leading qualifiers stripped before reading a cell as a number ("< 1")
+NUMBER_PREFIX = re.compile(r"^[<>~=\s]+")
+
+FILTER_PART = re.compile(r"^\{(?P<column>[^}]+)\}\s+(?P<operator>\S+)\s*(?P<value>.*)$")
+
+# DataTable filter operators (symbol and word spellings) mapped to a
+# canonical name. An "i" prefix makes text comparisons case-insensitive and
+# an "s" prefix case-sensitive, which is also the default.
+OPERATORS = {
+    "=": "eq", "eq": "eq",
+    "!=": "ne", "ne": "ne",
+    "<": "lt", "lt": "lt",
+    "<=": "le", "le": "le",
+    ">": "gt", "gt": "gt",
+    ">=": "ge", "ge": "ge",
+    "contains": "contains",
+    "datestartswith": "datestartswith",
+}
+
+COMPARISONS = {
+    "eq": lambda a, b: a == b,
+    "ne": lambda a, b: a != b,
+    "lt": lambda a, b: a < b,
+    "le": lambda a, b: a <= b,
+    "gt": lambda a, b: a > b,
+    "ge": lambda a, b: a >= b,
+}
+
+
+def numeric_value(cell):
+    """A cell as a number ("6815", "< 1"), or None if it is not numeric."""
+    if isinstance(cell, (int, float)):
+        return cell
+    try:
+        return float(NUMBER_PREFIX.sub("", str(cell)))
+    except ValueError:
+        return None
+
+
+def build_sort_index(values):
+    """Row positions sorted by value, with the rows holding no value apart.
+
+    Columns that are mostly numeric (budgets stored as text) sort by number;
+    anything else sorts as text.
+    """
+    values = pd.Series(list(values), dtype=object)
+    present = values[values.notna()]
+    keys = pd.DataFrame({
+        "number": pd.to_numeric(present.map(numeric_value), errors="coerce"),
+        "text": present.astype(str),
+    })
+    by = ["number", "text"] if keys["number"].notna().sum() * 2 >= len(keys) else ["text"]
+    order = keys.sort_values(by, kind="stable", na_position="last").index
+    return {
+        "order": [int(i) for i in order],
+        "nulls": [int(i) for i in values.index[values.isna()]],
+    }
+
+
+def _parse_value(text, numeric):
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in ("'", '"', "`"):
+        return text[1:-1].replace("\\" + text[0], text[0])
+    if not numeric:
+        return text
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def parse_filter(filter_query):
+    """Split a DataTable filter query into (column, operator, value, insensitive) terms.
+
+    Terms the table would not produce (unknown operators, ``||``) are
+    ignored rather than rejected.
+    """
+    terms = []
+    for part in (filter_query or "").split(" && "):
+        match = FILTER_PART.match(part.strip())
+        if not match:
+            continue
+        operator, insensitive = match["operator"], False
+        if operator[0] in "is" and operator[1:] in OPERATORS:
+            operator, insensitive = operator[1:], operator[0] == "i"
+        if operator not in OPERATORS:
+            continue
+        operator = OPERATORS[operator]
+        value = _parse_value(match["value"], numeric=operator in COMPARISONS)
+        if insensitive and isinstance(value, str):
+            value = value.lower()
+        terms.append((match["column"], operator, value, insensitive))
+    return terms
+
+
+def _matches(cell, operator, value, insensitive):
+    if cell is None:
+        return operator == "ne"
+    if insensitive and isinstance(cell, str):
+        cell = cell.lower()
+    if operator == "contains":
+        return value in str(cell)
+    if operator == "datestartswith":
+        return str(cell).startswith(value)
+    if isinstance(value, float):
+        cell = numeric_value(cell)
+        if cell is None:
+            return operator == "ne"
+    elif not isinstance(cell, str):
+        cell = str(cell)
+    return COMPARISONS[operator](cell, value)
+
+
+def _sorted_rows(table, sort_by):
+    n_rows = len(table["data"])
+    if not sort_by or sort_by[0]["column_id"] not in table["sort_index"]:
+        return range(n_rows)
+    index = table["sort_index"][sort_by[0]["column_id"]]
+    order = index["order"] if sort_by[0]["direction"] == "asc" else index["order"][::-1]
+    return order + index["nulls"]
+
+
+def query_table(table, page_current, page_size, sort_by=None, filter_query=None):
+    """Row positions of the requested page, its (clamped) number and the page count."""
+    rows = _sorted_rows(table, sort_by)
+
+    terms = [
+        term for term in parse_filter(filter_query)
+        if term[0] in table["sort_index"]
+    ]
+    if terms:
+        data = table["data"]
+        rows = [
+            i for i in rows
+            if all(_matches(data[i][term[0]], *term[1:]) for term in terms)
+        ]
+
+    page_count = max(1, math.ceil(len(rows) / page_size))
+    page_current = max(0, min(page_current or 0, page_count - 1))
+    start = page_current * page_size
+    return list(rows[start:start + page_size]), page_current, page_count
+
+
+def table_page(table, rows):
+    """The DataTable data and tooltip_data of some row positions."""
+    return (
+        [table["data"][i] for i in rows],
+        [table["tooltip_data"][i] for i in rows],
+    )
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import aggregate_country, build_emissions_cube, select_view
+from figure_cache import figure_loader
+
+SECTORS = ["agriculture", "buildings", "forestry-and-land-use", "manufacturing", "power", "transportation", "waste"]
+
+YEARS = range(2000, 2011)
+
+
+@pytest.fixture(scope="module")
+def inventory():
+    """Raw rows of one country with gaps, and a land-use sink that is net negative."""
+    rng = np.random.default_rng(3)
+    rows = []
+    for year in YEARS:
+        for sector in SECTORS:
+            if rng.random() < 0.2:
+                continue
+            for _ in range(3):
+                value = rng.lognormal(3, 1)
+                rows.append(("USA", year, sector, -value if sector == "forestry-and-land-use" else value))
+    return pd.DataFrame(rows, columns=["iso3_country", "year", "sector", "emissions"])
+
+
+@pytest.fixture(scope="module")
+def agg(inventory):
+    cube = build_emissions_cube(inventory)
+    return aggregate_country(cube[["year", "sector", "emissions"]])
+
+
+def expected_view(df, year_range, sectors=None, share_year=None, top_n=5):
+    """The same view by plain filtering and grouping of the raw rows."""
+    first, last = year_range
+    window = df[df["year"].between(first, last)]
+    share_rows = df[df["year"] == share_year] if share_year is not None else window
+
+    totals = share_rows.groupby("sector")["emissions"].sum()
+    shares = (totals / totals.sum()).sort_values(kind="stable")
+    chosen = sectors or shares.sort_values(ascending=False, kind="stable").index[:top_n].tolist()
+
+    yearly = window[window["sector"].isin(chosen)].groupby(["year", "sector"], as_index=False)["emissions"].sum()
+    yearly["share"] = yearly["emissions"] / yearly.groupby("year")["emissions"].transform("sum")
+    order = yearly.groupby("sector")["year"].min().reset_index().sort_values(["year", "sector"])["sector"]
+    series = {
+        sector: yearly[yearly["sector"] == sector].sort_values("year")
+        for sector in order
+    }
+    return shares, series
+
+
+@pytest.mark.parametrize("year_range, sectors, share_year", [
+    ((2000, 2010), None, 2010),
+    ((2000, 2010), None, None),
+    ((2003, 2007), None, None),
+    ((2004, 2004), None, None),
+    ((2000, 2010), ["waste", "power", "forestry-and-land-use"], None),
+    ((2002, 2006), ["buildings", "agriculture"], None),
+    ((2000, 2010), ["power", "unknown"], 2010),
+])
+def test_select_view_matches_groupby(inventory, agg, year_range, sectors, share_year):
+    view = select_view(agg, year_range, sectors, share_year=share_year)
+    shares, series = expected_view(inventory, year_range, [s for s in sectors or [] if s in SECTORS], share_year)
+
+    assert view["share_sectors"] == shares.index.tolist()
+    np.testing.assert_allclose(view["shares"], shares.to_numpy())
+    assert view["sector_order"] == shares.sort_values(ascending=False, kind="stable").index.tolist()
+
+    assert [s["sector"] for s in view["series"]] == list(series)
+    for actual in view["series"]:
+        rows = series[actual["sector"]]
+        assert actual["year"].tolist() == rows["year"].tolist()
+        np.testing.assert_allclose(actual["emissions"], rows["emissions"])
+        np.testing.assert_allclose(actual["share"], rows["share"])
+
+
+def test_share_year_without_data(agg):
+    view = select_view(agg, (2000, 2010), share_year=2015)
+    assert view["share_sectors"] == [] and view["series"] == []
+
+
+@pytest.fixture(scope="module")
+def load_figures(agg):
+    store = {"version": "test", "first_year": YEARS[0], "latest_year": YEARS[-1], "countries": ["USA"]}
+    return figure_loader(store, lambda country, part: agg, cache_dir=None)
+
+
+@pytest.mark.parametrize("year_range, sectors, title", [
+    (None, None, "USA: Emissions by Sector (2010)"),
+    ([2000, 2010], [], "USA: Emissions by Sector (2010)"),
+    ([2000, 2010], ["power", "waste"], "USA: Emissions by Sector (2010)"),
+    ([2003, 2010], ["power", "waste"], "USA: Emissions by Sector (2003–2010)"),
+    ([2005, 2005], None, "USA: Emissions by Sector (2005)"),
+])
+def test_bar_years_follow_the_range_alone(load_figures, year_range, sectors, title):
+    bar = load_figures("USA", year_range, sectors)[0]
+    assert bar["layout"]["title"]["text"] == title
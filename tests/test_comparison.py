@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import aggregate_country, build_emissions_cube, select_view
+from comparison import build_dense_cube, compare
+
+SECTORS = ["agriculture", "forestry-and-land-use", "power", "transportation", "waste"]
+
+
+@pytest.fixture(scope="module")
+def cube():
+    """Three countries; land use is a net sink in AAA and CCC, BBB skips
+    some sectors and reports waste as exactly 0."""
+    rng = np.random.default_rng(3)
+    rows = []
+    for country in ("AAA", "BBB", "CCC"):
+        for year in range(2018, 2023):
+            for sector in SECTORS:
+                if country == "BBB" and sector in ("agriculture", "forestry-and-land-use"):
+                    continue
+                emissions = rng.lognormal(3, 1)
+                if sector == "forestry-and-land-use":
+                    emissions = -emissions
+                elif country == "BBB" and sector == "waste":
+                    emissions = 0.0
+                rows.append((country, year, sector, emissions))
+    return build_emissions_cube(pd.DataFrame(rows, columns=["iso3_country", "year", "sector", "emissions"]))
+
+
+def _store(cube):
+    """The parts of an opened store that build_dense_cube reads."""
+    sectors = np.unique(cube["sector"].to_numpy().astype(object))
+    iso3 = cube["iso3_country"].to_numpy()
+    countries = sorted(set(iso3))
+    return {
+        "columns": {
+            "year": cube["year"].to_numpy(),
+            "sector": np.searchsorted(sectors, cube["sector"].to_numpy().astype(object)),
+            "emissions": cube["emissions"].to_numpy(),
+        },
+        "manifest": {"emissions": {"partitions": {
+            country: (int(np.searchsorted(iso3, country, "left")), int(np.searchsorted(iso3, country, "right")))
+            for country in countries
+        }}},
+        "countries": countries,
+        "sectors": sectors,
+    }
+
+
+@pytest.mark.parametrize("countries", [["AAA"], ["BBB"], ["AAA", "BBB", "CCC"], ["CCC", "ZZZ", "AAA"]])
+def test_shares_match_select_view(cube, countries):
+    comparison = compare(build_dense_cube(_store(cube)), countries, 2022)
+    assert comparison["countries"] == [c for c in countries if c != "ZZZ"]
+
+    # Every sector any selected country reports, net sinks and zeros included
+    listed = set(cube[cube["iso3_country"].isin(countries) & (cube["year"] == 2022)]["sector"])
+    assert set(comparison["sectors"]) == listed
+
+    for i, country in enumerate(comparison["countries"]):
+        country_cube = cube[cube["iso3_country"] == country][["year", "sector", "emissions"]]
+        view = select_view(aggregate_country(country_cube), (2018, 2022), share_year=2022)
+        expected = dict(zip(view["share_sectors"], view["shares"]))
+        actual = dict(zip(comparison["sectors"], comparison["shares"][i]))
+        assert actual == pytest.approx({sector: expected.get(sector, 0.0) for sector in actual})
+
+
+def test_year_without_data(cube):
+    comparison = compare(build_dense_cube(_store(cube)), ["AAA"], 2030)
+    assert comparison["sectors"] == []
+    assert comparison["shares"].shape == (1, 0)
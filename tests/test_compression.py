@@ -0,0 +1,45 @@
+import gzip
+import re
+
+import pytest
+from dash import Dash, dcc, html
+
+from compression import COMPRESS_MIN_SIZE, install
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = Dash(__name__)
+    app.layout = html.Div([dcc.Dropdown(id="country", options=["USA", "DEU"], value="USA")])
+    install(app.server)
+    return app.server.test_client()
+
+
+def _bundle_url(client, name):
+    page = client.get("/").get_data(as_text=True)
+    return next(src for src in re.findall(r'src="([^"]+)"', page) if name in src)
+
+
+def test_component_bundles_are_gzipped(client):
+    url = _bundle_url(client, "dash_core_components.v")
+    plain = client.get(url)
+    response = client.get(url, headers={"Accept-Encoding": "gzip, deflate"})
+
+    assert response.mimetype == "text/javascript"
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.get_data()) == plain.get_data()
+    assert len(response.get_data()) < len(plain.get_data()) / 2
+
+
+def test_gzipped_only_when_accepted(client):
+    url = _bundle_url(client, "dash_renderer")
+    assert client.get(url).headers.get("Content-Encoding") is None
+    assert client.get(url, headers={"Accept-Encoding": "br"}).headers.get("Content-Encoding") is None
+    assert client.get(url, headers={"Accept-Encoding": "gzip"}).headers["Content-Encoding"] == "gzip"
+
+
+def test_small_responses_are_sent_as_is(client):
+    response = client.get("/_dash-layout", headers={"Accept-Encoding": "gzip"})
+    assert len(response.get_data()) < COMPRESS_MIN_SIZE
+    assert response.headers.get("Content-Encoding") is None
@@ -0,0 +1,75 @@
+from descriptions import NAMESPACE, render_description
+
+
+def _node(type_, children=None, **props):
+    if children is not None:
+        props["children"] = children
+    return {"type": type_, "namespace": NAMESPACE, "props": props}
+
+
+def test_blank_descriptions():
+    assert render_description(None) is None
+    assert render_description("   ") is None
+
+
+def test_plain_text_and_entities():
+    assert render_description("Tax &amp; credit") == _node("Span", "Tax & credit")
+    # Escaped markup stays text
+    assert render_description("&lt;b&gt;bold&lt;/b&gt;") == _node("Span", "<b>bold</b>")
+
+
+def test_allowed_tags_are_kept():
+    assert render_description("<div><p>One <em>two</em></p><br></div>") == _node("Span", [
+        _node("Div", [_node("P", ["One ", _node("Em", "two")]), _node("Br")]),
+    ])
+
+
+def test_scripts_are_dropped_with_their_content():
+    assert render_description("a<script>alert(1)</script>b<style>p {}</style>c") == _node("Span", "abc")
+
+
+def test_unknown_tags_are_unwrapped():
+    assert render_description('<font color="red">a</font><table><tr><td>b</td></tr></table>') == _node("Span", "ab")
+
+
+def test_only_safe_link_targets_are_kept():
+    safe = {"target": "_blank", "rel": "noopener noreferrer"}
+    assert render_description('<a href=" https://iea.org/p ">x</a>') == _node("Span", [
+        _node("A", "x", href="https://iea.org/p", **safe),
+    ])
+    assert render_description('<a href="mailto:a@b.org">x</a>') == _node("Span", [
+        _node("A", "x", href="mailto:a@b.org", **safe),
+    ])
+    for href in ("javascript:alert(1)", " JavaScript:alert(1)", "data:text/html,x", "/relative"):
+        assert render_description(f'<a href="{href}">x</a>') == _node("Span", [_node("A", "x")])
+
+
+def test_other_attributes_are_dropped():
+    assert render_description('<p onclick="x()" style="color:red" class="c">a</p>') == _node("Span", [_node("P", "a")])
+
+
+def test_unclosed_list_items():
+    assert render_description("<ul><li>one<li>two</ul><li>three") == _node("Span", [
+        _node("Ul", [_node("Li", "one"), _node("Li", "two")]),
+        _node("Li", "three"),
+    ])
+
+
+def test_nested_lists_keep_their_items():
+    assert render_description("<ul><li>a<ul><li>b<li>c</ul><li>d</ul>") == _node("Span", [
+        _node("Ul", [
+            _node("Li", ["a", _node("Ul", [_node("Li", "b"), _node("Li", "c")])]),
+            _node("Li", "d"),
+        ]),
+    ])
+
+
+def test_unclosed_paragraphs():
+    assert render_description("<div><p>a<p>b</div><p>c") == _node("Span", [
+        _node("Div", [_node("P", "a"), _node("P", "b")]),
+        _node("P", "c"),
+    ])
+
+
+def test_stray_end_tags_are_ignored():
+    assert render_description("<p>a</li>b</p></div>") == _node("Span", [_node("P", "ab")])
@@ -0,0 +1,31 @@
+import os
+
+from figure_cache import FIGURE_FORMAT, prune_cache
+
+
+def _mkdir(*parts):
+    path = os.path.join(*parts)
+    os.makedirs(path)
+    return path
+
+
+def test_prune_cache_keeps_figures_of_kept_snapshots(tmp_path):
+    store_dir, cache_dir = str(tmp_path / "data_store"), str(tmp_path / "figures")
+    for version in ("aaaa", "bbbb"):
+        with open(os.path.join(_mkdir(store_dir, version), "manifest.json"), "w") as f:
+            f.write("{}")
+
+    for name in (f"aaaa.{FIGURE_FORMAT}", f"bbbb.{FIGURE_FORMAT}", f"aaaa.{FIGURE_FORMAT - 1}", f"cccc.{FIGURE_FORMAT}"):
+        with open(os.path.join(_mkdir(cache_dir, name), "USA.json"), "w") as f:
+            f.write("[]")
+    # Not written by the cache: left alone
+    _mkdir(cache_dir, "notes")
+    _mkdir(cache_dir, ".tmp-x")
+
+    prune_cache(cache_dir, store_dir)
+    assert sorted(os.listdir(cache_dir)) == sorted([".tmp-x", f"aaaa.{FIGURE_FORMAT}", f"bbbb.{FIGURE_FORMAT}", "notes"])
+
+
+def test_prune_cache_without_a_directory(tmp_path):
+    prune_cache(None, str(tmp_path))
+    prune_cache(str(tmp_path / "missing"), str(tmp_path))
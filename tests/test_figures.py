@@ -0,0 +1,117 @@
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+import pytest
+
+from aggregates import aggregate_country, build_emissions_cube, select_view
+from figures import build_figures, figure_template
+
+# ------------------------------------------------------------
+# PARITY WITH THE PLOTLY EXPRESS FIGURES
+# ------------------------------------------------------------
+# The dict figures must render exactly what the dashboard's px code used
+# to produce for the default view (shares of the latest year, top five
+# sectors over every year). Arrays are compared as float32, since that is
+# how the dict figures send them, and the template is added back as the
+# page does in the browser.
+
+SECTORS = ["agriculture", "buildings", "manufacturing", "power", "transportation", "waste", "mining"]
+
+
+@pytest.fixture(scope="module")
+def inventory():
+    """Raw rows for three countries; AAA complete, BBB patchy and ending
+    before the latest year for some sectors, CCC stopping two years early."""
+    rng = np.random.default_rng(0)
+    rows = []
+    for country, years in (("AAA", range(2015, 2023)), ("BBB", range(2015, 2023)), ("CCC", range(2015, 2021))):
+        for year in years:
+            for sector in SECTORS:
+                if country == "BBB" and rng.random() < 0.3:
+                    continue
+                for _ in range(2):
+                    rows.append((country, year, sector, rng.lognormal(3, 1)))
+    return pd.DataFrame(rows, columns=["iso3_country", "year", "sector", "emissions"])
+
+
+def px_figures(df, country, latest_year):
+    """The dashboard's original px code."""
+    df_country = df[df["iso3_country"] == country]
+    df_latest = df_country[df_country["year"] == latest_year]
+    sector_latest = df_latest.groupby("sector", as_index=False).agg(emissions=("emissions", "sum"))
+    sector_latest["share"] = sector_latest["emissions"] / sector_latest["emissions"].sum()
+    sector_latest = sector_latest.sort_values("share")
+
+    fig1 = px.bar(
+        sector_latest, x="share", y="sector", orientation="h",
+        title=f"{country}: Emissions by Sector ({latest_year})",
+        labels={"share": "Share of national emissions", "sector": "Sector"}
+    )
+    fig1.update_xaxes(tickformat=".0%")
+    fig1.update_layout(margin=dict(l=20, r=20, t=40, b=20), title_font_size=14)
+
+    top_sectors = sector_latest.sort_values("share", ascending=False).head(5)["sector"].tolist()
+    df_top = df_country[df_country["sector"].isin(top_sectors)]
+    yearly_totals = df_top.groupby(["year", "sector"], as_index=False).agg(emissions=("emissions", "sum"))
+
+    fig2 = px.line(
+        yearly_totals, x="year", y="emissions", color="sector",
+        title=f"{country}: Emissions Trends (Top 5 Sectors)",
+        labels={"emissions": "Emissions", "year": "Year", "sector": "Sector"}
+    )
+    fig2.update_layout(margin=dict(l=20, r=20, t=40, b=20), title_font_size=14)
+
+    yearly_totals["year_total"] = yearly_totals.groupby("year")["emissions"].transform("sum")
+    yearly_totals["share"] = yearly_totals["emissions"] / yearly_totals["year_total"]
+    sector_order = sector_latest.sort_values("share", ascending=False)["sector"].tolist()
+
+    fig3 = px.area(
+        yearly_totals, x="year", y="share", color="sector", groupnorm="fraction",
+        category_orders={"sector": sector_order},
+        title=f"{country}: Emissions Structure Over Time (Top 5 Sectors)",
+        labels={"share": "Share of emissions", "year": "Year", "sector": "Sector"}
+    )
+    fig3.update_yaxes(tickformat=".0%")
+    fig3.update_layout(margin=dict(l=20, r=20, t=40, b=20), title_font_size=14)
+    return fig1, fig2, fig3
+
+
+def dict_figures(df, country, first_year, latest_year):
+    cube = build_emissions_cube(df)
+    country_cube = cube[cube["iso3_country"] == country][["year", "sector", "emissions"]]
+    view = select_view(aggregate_country(country_cube), (first_year, latest_year), share_year=latest_year)
+    return build_figures(country, view)
+
+
+def _decoded(value):
+    """JSON-ready figure with typed arrays decoded to float32 lists."""
+    if isinstance(value, dict):
+        if set(value) == {"dtype", "bdata"}:
+            array = np.frombuffer(base64.b64decode(value["bdata"]), dtype=np.dtype(value["dtype"]).newbyteorder("<"))
+            return array.astype(np.float32).tolist()
+        return {key: _decoded(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if value and all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in value):
+            return np.asarray(value, dtype=np.float32).tolist()
+        return [_decoded(item) for item in value]
+    return value
+
+
+def _as_json(figure):
+    return _decoded(json.loads(pio.to_json(figure, validate=False)))
+
+
+@pytest.mark.parametrize("country", ["AAA", "BBB", "CCC", "ZZZ"])
+def test_dict_figures_match_px(inventory, country):
+    first_year, latest_year = int(inventory["year"].min()), int(inventory["year"].max())
+
+    expected = px_figures(inventory, country, latest_year)
+    actual = dict_figures(inventory, country, first_year, latest_year)
+
+    for px_figure, figure in zip(expected, actual):
+        figure = dict(figure, layout=dict(figure["layout"], template=figure_template()))
+        assert _as_json(figure) == _as_json(px_figure)
@@ -0,0 +1,54 @@
+import re
+
+import pytest
+from dash import Dash, Input, Output, dcc, html
+
+from metrics import _render_histograms, install, timed_callback
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = Dash(__name__)
+    app.layout = html.Div([
+        dcc.Dropdown(id="country", options=["USA", "DEU"], value="USA"),
+        html.Div(id="title"),
+        html.Div(id="subtitle"),
+    ])
+
+    @app.callback(Output("title", "children"), Output("subtitle", "children"), Input("country", "value"))
+    @timed_callback
+    def update_titles(country):
+        return country, f"{country} emissions"
+
+    install(app, lambda: None)
+    return app.server.test_client()
+
+
+def _series(name):
+    """Label sets of a histogram's _count lines."""
+    return {
+        labels for labels in re.findall(rf"^{name}_count\{{(.*)\}} \d+$", "\n".join(_render_histograms()), re.M)
+    }
+
+
+def test_callback_histograms_share_labels(client):
+    response = client.post("/_dash-update-component", json={
+        "output": "..title.children...subtitle.children..",
+        "outputs": [{"id": "title", "property": "children"}, {"id": "subtitle", "property": "children"}],
+        "inputs": [{"id": "country", "property": "value", "value": "DEU"}],
+        "changedPropIds": ["country.value"],
+        "state": [],
+    })
+    assert response.status_code == 200
+
+    for name in ("dashboard_request_seconds", "dashboard_response_bytes", "dashboard_callback_seconds"):
+        assert _series(name) == {'callback="title"'}, name
+
+
+def test_callback_called_outside_a_request():
+    @timed_callback
+    def update_nothing():
+        return None
+
+    update_nothing()
+    assert 'callback="unknown"' in _series("dashboard_callback_seconds")
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from policy_matching import (
+    match_block, match_policies, normalize_policy_title, normalize_title, token_set_ratio,
+)
+
+WORDS = (
+    "energy tax credit grid vehicle efficiency support households industry emissions "
+    "electricity fuel subsidy price cap renewable solar wind heat pump program national "
+    "plan recovery resilience petroperú čeps transport rail bus charging investment fund "
+    "green hydrogen building retrofit rebate loan guarantee coal phase out carbon levy"
+).split()
+
+
+def _tokens(text):
+    return set(text.split())
+
+
+def test_normalize_title():
+    assert normalize_title("Tariff shield & exceptional  measures (2022)") == "tariff shield exceptional measures 2022"
+    assert normalize_title("Capital to Petroperú") == "capital to petroper"
+    assert normalize_policy_title("Capital to Petroperú") == "capital to petroperú"
+    assert normalize_title(float("nan")) == ""
+
+
+def test_token_set_ratio_known_scores():
+    # Scores recorded in merged.csv by the original matching
+    assert token_set_ratio(
+        _tokens("exceptional provision of capital to petroper"),
+        _tokens(normalize_policy_title("Exceptional provision of capital to Petroperú")),
+    ) == pytest.approx(98.876, abs=1e-3)
+    assert token_set_ratio(
+        _tokens("subsidy for czech electricity tso eps"),
+        _tokens(normalize_policy_title("Subsidy for Czech electricity TSO ČEPS")),
+    ) == pytest.approx(98.667, abs=1e-3)
+    assert token_set_ratio(_tokens("household support fund"), _tokens("household support fund 2nd extension")) == 100.0
+    assert token_set_ratio(set(), _tokens("anything")) == 0.0
+
+
+def test_token_set_ratio_cutoff():
+    a, b = _tokens("national energy plan"), _tokens("national grid investment plan")
+    score = token_set_ratio(a, b)
+    assert token_set_ratio(a, b, score_cutoff=score) == score
+    assert token_set_ratio(a, b, score_cutoff=score + 1e-6) == 0.0
+
+
+def _perturbed(rng, title):
+    words = title.split()
+    change = rng.integers(4)
+    if change == 0 and len(words) > 1:
+        words.pop(rng.integers(len(words)))
+    elif change == 1:
+        words.insert(rng.integers(len(words) + 1), rng.choice(WORDS))
+    elif change == 2:
+        k = rng.integers(len(words))
+        word = words[k]
+        words[k] = word[:-1] if len(word) > 1 else word + "s"
+    return normalize_title(" ".join(words))
+
+
+def test_pruned_search_matches_brute_force():
+    rng = np.random.default_rng(7)
+    titles = [
+        normalize_policy_title(" ".join(rng.choice(WORDS, rng.integers(2, 9))))
+        for _ in range(400)
+    ]
+    # Titles repeated (ties go to the first), perturbed and unrelated
+    titles[10] = titles[3]
+    queries = [_perturbed(rng, titles[k]) for k in rng.integers(len(titles), size=250)]
+    queries += [normalize_title(" ".join(rng.choice(WORDS, rng.integers(1, 6)))) for _ in range(50)]
+    queries += [titles[3], "", "zzz"]
+
+    best_index, best_score = match_block(queries, titles)
+
+    title_tokens = [_tokens(t) for t in titles]
+    for row, query in enumerate(queries):
+        scores = [token_set_ratio(_tokens(query), tokens) for tokens in title_tokens]
+        expected = int(np.argmax(scores))
+        assert (best_index[row], best_score[row]) == (expected, scores[expected]), query
+
+
+def test_match_block_without_titles():
+    best_index, best_score = match_block(["energy tax"], [])
+    assert best_index.tolist() == [-1]
+    assert np.isnan(best_score).all()
+
+
+def test_match_policies():
+    fiscal = pd.DataFrame({
+        "country": ["Peru", "Peru", "Chile", "Turkiye"],
+        "policy": ["Exceptional provision of capital to Petroperu", "Something else entirely", "Green hydrogen fund", "Energy subsidy"],
+        "measures": "m", "start_year": 2022, "status": "In force", "budget_commitment": "< 1",
+    })
+    iea = pd.DataFrame({
+        "iso3": ["PER", "CHL", "CHL"],
+        "title": ["Exceptional provision of capital to Petroperú", "Green Hydrogen Fund", "Green Hydrogen Fund"],
+        "description": ["peru", "chile 1", "chile 2"],
+    })
+    merged = match_policies(fiscal, iea, workers=1)
+
+    assert merged["policy"].tolist() == [
+        "Exceptional provision of capital to Petroperu", "Something else entirely",
+        "Green hydrogen fund", "Green hydrogen fund", "Energy subsidy",
+    ]
+    assert merged["matched_title"].iloc[0] == "Exceptional provision of capital to Petroperú"
+    assert pd.isna(merged["matched_title"].iloc[1])
+    # A title the IEA lists twice gives one row per listing
+    assert merged["description"].tolist()[2:4] == ["chile 1", "chile 2"]
+    assert merged["match_score"].iloc[1] < 85
+    # No IEA policies for the country: no score at all
+    assert np.isnan(merged["match_score"].iloc[4])
@@ -0,0 +1,118 @@
+import pytest
+
+from table_query import _matches, build_sort_index, numeric_value, parse_filter, query_table
+
+
+def _table(rows):
+    """A policy table payload as datastore.py builds it."""
+    columns = ["title", "budget_commitment"]
+    return {
+        "data": rows,
+        "tooltip_data": [{"title": {"value": row["title"], "type": "markdown"}} for row in rows],
+        "sort_index": {column: build_sort_index(row[column] for row in rows) for column in columns},
+    }
+
+
+@pytest.fixture
+def table():
+    return _table([
+        {"id": "USA-1", "title": "Clean Vehicle Tax Credit", "budget_commitment": "6815"},
+        {"id": "USA-2", "title": "grid resilience grants", "budget_commitment": "< 1"},
+        {"id": "USA-3", "title": "Home Energy Rebates", "budget_commitment": None},
+        {"id": "USA-4", "title": "Tax credit for heat pumps", "budget_commitment": "25"},
+        {"id": "USA-5", "title": None, "budget_commitment": "n/a"},
+    ])
+
+
+def test_numeric_value_reads_qualified_budgets():
+    assert numeric_value("6815") == 6815
+    assert numeric_value("< 1") == 1
+    assert numeric_value(">= 2.5") == 2.5
+    assert numeric_value(3) == 3
+    assert numeric_value("n/a") is None
+
+
+def test_parse_filter_quoted_values():
+    assert parse_filter('{title} contains "Tax Credit"') == [("title", "contains", "Tax Credit", False)]
+    assert parse_filter("{title} = 'It\\'s'") == [("title", "eq", "It's", False)]
+    # Quoted numbers stay text
+    assert parse_filter('{budget_commitment} = "25"') == [("budget_commitment", "eq", "25", False)]
+
+
+def test_parse_filter_operator_spellings():
+    assert parse_filter("{title} icontains Tax") == [("title", "contains", "tax", True)]
+    assert parse_filter("{title} scontains Tax") == [("title", "contains", "Tax", False)]
+    assert parse_filter("{budget_commitment} >= 100 && {budget_commitment} lt 500") == [
+        ("budget_commitment", "ge", 100.0, False),
+        ("budget_commitment", "lt", 500.0, False),
+    ]
+
+
+def test_parse_filter_ignores_unknown_terms():
+    assert parse_filter(None) == []
+    assert parse_filter("") == []
+    assert parse_filter("{title} matches x && not a term") == []
+
+
+def test_matches_case_insensitive_contains():
+    assert _matches("Clean Vehicle Tax Credit", "contains", "tax", True)
+    assert not _matches("Clean Vehicle Tax Credit", "contains", "tax", False)
+
+
+def test_matches_numbers_stored_as_text():
+    assert _matches("< 1", "lt", 5.0, False)
+    assert not _matches("< 1", "gt", 5.0, False)
+    assert _matches("6815", "ge", 100.0, False)
+    # Cells that are not numbers only satisfy "not equal"
+    assert not _matches("n/a", "lt", 5.0, False)
+    assert _matches("n/a", "ne", 5.0, False)
+
+
+def test_matches_null_cells():
+    assert not _matches(None, "contains", "tax", True)
+    assert not _matches(None, "eq", "x", False)
+    assert _matches(None, "ne", "x", False)
+
+
+def test_sort_index_numeric_column():
+    index = build_sort_index(["10", "< 1", None, "2", "n/a"])
+    # Numbers first by value, text that is not a number after them
+    assert index == {"order": [1, 3, 0, 4], "nulls": [2]}
+
+
+def test_sort_index_text_column():
+    assert build_sort_index(["b", None, "A", "c"]) == {"order": [2, 0, 3], "nulls": [1]}
+
+
+def test_nulls_sort_last_in_both_directions(table):
+    ids = lambda rows: [table["data"][i]["id"] for i in rows]
+
+    rows, _, _ = query_table(table, 0, 10, [{"column_id": "budget_commitment", "direction": "asc"}])
+    assert ids(rows) == ["USA-2", "USA-4", "USA-1", "USA-5", "USA-3"]
+
+    rows, _, _ = query_table(table, 0, 10, [{"column_id": "budget_commitment", "direction": "desc"}])
+    assert ids(rows) == ["USA-5", "USA-1", "USA-4", "USA-2", "USA-3"]
+
+    rows, _, _ = query_table(table, 0, 10, [{"column_id": "title", "direction": "desc"}])
+    assert ids(rows)[-1] == "USA-5"
+
+
+def test_filter_and_pages(table):
+    rows, page, page_count = query_table(table, 0, 10, None, "{title} icontains tax && {budget_commitment} > 1")
+    assert [table["data"][i]["id"] for i in rows] == ["USA-1", "USA-4"]
+    assert (page, page_count) == (0, 1)
+
+    # A page past the end is clamped to the last one
+    rows, page, page_count = query_table(table, 7, 2)
+    assert (page, page_count) == (2, 3)
+    assert [table["data"][i]["id"] for i in rows] == ["USA-5"]
+
+    # And a negative one (sent by a client) to the first
+    rows, page, page_count = query_table(table, -3, 2)
+    assert (page, page_count) == (0, 3)
+    assert [table["data"][i]["id"] for i in rows] == ["USA-1", "USA-2"]
+
+
+def test_filter_on_unknown_column_is_ignored(table):
+    rows, _, _ = query_table(table, 0, 10, None, "{description} contains x")
+    assert len(rows) == 5
@@ -0,0 +1,28 @@
+import gc
+
+from app import current_snapshot, server
+from refresh import warm_snapshot
+
+# ------------------------------------------------------------
+# WSGI ENTRY POINT
+# ------------------------------------------------------------
+# Meant to be imported once in the gunicorn master and then forked:
+#
+#   gunicorn -c gunicorn.conf.py
+#
+# Importing it opens the store and warms the current snapshot (the figures
+# of every country and the dense comparison cube) before any worker
+# exists. The emissions columns are memory-mapped .npy files and the
+# aggregates and comparison cube are read-only numpy arrays, so the
+# workers share those pages copy-on-write instead of each building its
+# own copy. Everything allocated so far is then moved out of the
+# collector's reach with gc.freeze(): a worker's collections would
+# otherwise write to the headers of these objects and copy their pages.
+#
+# Snapshots swapped in later by a worker's refresh thread are private to
+# that worker until the next restart.
+
+warm_snapshot(current_snapshot())
+
+gc.collect()
+gc.freeze()